@@ -26,15 +26,22 @@ class Token:
     type: int
     literal: str
     line: int
+    @property
+    def value(self) -> int | None: ...
     def __init__(self, type: int, literal: str, line: int) -> None: ...
 
+class InternTable:
+    def __init__(self) -> None: ...
+    def __len__(self) -> int: ...
+
 class Lexer:
     text: str
     start: str
     current: str
     line: int
-    def __init__(self, text: str) -> None: ...
+    def __init__(self, text: str, interned: InternTable | None = None, /) -> None: ...
     def scan_token(self) -> Token: ...
+    def scan_tokens(self, max_count: int, /) -> list[Token]: ...
     def advance(self) -> str: ...
     def peek(self) -> str: ...
     def peek_next(self) -> str: ...
@@ -3,23 +3,11 @@
 
 #include "tokenobject.h"
 #include "lexerobject.h"
+#include "interntable.h"
 
-static struct PyModuleDef moduledef = {
-	.m_base = PyModuleDef_HEAD_INIT,
-	.m_name = "clex",
-	.m_size = -1,
-};
-
-/* Initialization function for the module */
-PyMODINIT_FUNC PyInit_clex(void)
+static int clex_exec(PyObject *m)
 {
-	PyObject *m, *d, *s;
-
-	/* Create the module and add the functions */
-	m = PyModule_Create(&moduledef);
-	if (!m) {
-		return NULL;
-	}
+	PyObject *d, *s;
 
 	/* Add some symbolic constants to the module */
 	d = PyModule_GetDict(m);
@@ -33,6 +21,9 @@ PyMODINIT_FUNC PyInit_clex(void)
 	if (PyType_Ready(&PyLexer_Type) < 0)
 		goto err;
 
+	if (PyType_Ready(&PyInternTable_Type) < 0)
+		goto err;
+
 #define ADDTOKEN(NAME)                     \
 	s = PyLong_FromLong(NAME);         \
 	PyDict_SetItemString(d, #NAME, s); \
@@ -69,15 +60,41 @@ PyMODINIT_FUNC PyInit_clex(void)
 
 	// PyDict_SetItemString(d, "Token", (PyObject*)&PyToken_Type);
 	PyDict_SetItemString(d, "Lexer", (PyObject *)&PyLexer_Type);
+	PyDict_SetItemString(d, "InternTable", (PyObject *)&PyInternTable_Type);
 
-	return m;
+	return 0;
 
 err:
 	if (!PyErr_Occurred()) {
 		PyErr_SetString(PyExc_RuntimeError, "cannot load clex module.");
 	}
-	Py_DECREF(m);
-	return NULL;
+	return -1;
+}
+
+static PyModuleDef_Slot clex_slots[] = {
+	{ Py_mod_exec, clex_exec },
+	/* the types are static, so they cannot be shared between interpreters */
+	{ Py_mod_multiple_interpreters,
+	  Py_MOD_MULTIPLE_INTERPRETERS_NOT_SUPPORTED },
+#ifdef Py_GIL_DISABLED
+	/* lexers keep no shared state; a lexer itself must not be used from
+	   several threads at once */
+	{ Py_mod_gil, Py_MOD_GIL_NOT_USED },
+#endif
+	{ 0, NULL }
+};
+
+static struct PyModuleDef moduledef = {
+	.m_base = PyModuleDef_HEAD_INIT,
+	.m_name = "clex",
+	.m_size = 0,
+	.m_slots = clex_slots,
+};
+
+/* Initialization function for the module */
+PyMODINIT_FUNC PyInit_clex(void)
+{
+	return PyModuleDef_Init(&moduledef);
 }
 
 int main(int argc, char *argv[])
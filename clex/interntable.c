@@ -0,0 +1,150 @@
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdbool.h>
+#include <stdint.h>
+#include <string.h>
+
+#include "interntable.h"
+
+#define INTERN_TABLE_MIN_CAPACITY 1024
+
+static void interntable_dealloc(PyInternTableObject *self)
+{
+	for (Py_ssize_t i = 0; i < self->capacity; i++)
+		Py_XDECREF(self->entries[i].string);
+	PyMem_Free(self->entries);
+	Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static int interntable_init(PyInternTableObject *self, PyObject *args)
+{
+	if (!PyArg_ParseTuple(args, ""))
+		return -1;
+
+	if (self->entries != NULL)
+		return 0;
+
+	self->entries = PyMem_Calloc(INTERN_TABLE_MIN_CAPACITY, sizeof(InternEntry));
+	if (self->entries == NULL) {
+		PyErr_NoMemory();
+		return -1;
+	}
+	self->capacity = INTERN_TABLE_MIN_CAPACITY;
+	self->size = 0;
+	return 0;
+}
+
+static Py_ssize_t interntable_length(PyInternTableObject *self)
+{
+	return self->size;
+}
+
+/* FNV-1a */
+static inline size_t interntable_hash(const char *data, size_t size)
+{
+	uint64_t hash = 14695981039346656037ULL;
+	for (size_t i = 0; i < size; i++) {
+		hash ^= (unsigned char)data[i];
+		hash *= 1099511628211ULL;
+	}
+	return (size_t)hash;
+}
+
+static inline bool interntable_equals(PyObject *string, const char *data,
+				      size_t size)
+{
+	return (size_t)PyUnicode_GET_LENGTH(string) == size &&
+	       memcmp(PyUnicode_DATA(string), data, size) == 0;
+}
+
+static int interntable_grow(PyInternTableObject *self)
+{
+	Py_ssize_t capacity = self->capacity * 2;
+	InternEntry *entries = PyMem_Calloc(capacity, sizeof(InternEntry));
+	if (entries == NULL) {
+		PyErr_NoMemory();
+		return -1;
+	}
+
+	for (Py_ssize_t i = 0; i < self->capacity; i++) {
+		InternEntry entry = self->entries[i];
+		if (entry.string == NULL)
+			continue;
+		size_t index = entry.hash & (capacity - 1);
+		while (entries[index].string != NULL)
+			index = (index + 1) & (capacity - 1);
+		entries[index] = entry;
+	}
+
+	PyMem_Free(self->entries);
+	self->entries = entries;
+	self->capacity = capacity;
+	return 0;
+}
+
+static PyObject *interntable_intern_locked(PyInternTableObject *self,
+					   const char *data, size_t size)
+{
+	size_t hash = interntable_hash(data, size);
+	size_t index = hash & (self->capacity - 1);
+
+	/* linear probing, the table is kept at most half full */
+	InternEntry *entry;
+	while (entry = &self->entries[index], entry->string != NULL) {
+		if (entry->hash == hash &&
+		    interntable_equals(entry->string, data, size))
+			return Py_NewRef(entry->string);
+		index = (index + 1) & (self->capacity - 1);
+	}
+
+	PyObject *string = PyUnicode_New(size, 127);
+	if (string == NULL)
+		return NULL;
+	memcpy(PyUnicode_DATA(string), data, size);
+
+	entry->hash = hash;
+	entry->string = Py_NewRef(string);
+	self->size++;
+
+	if (self->size * 2 > self->capacity && interntable_grow(self) < 0) {
+		Py_DECREF(string);
+		return NULL;
+	}
+	return string;
+}
+
+PyObject *PyInternTable_Intern(PyInternTableObject *self, const char *data,
+			       size_t size)
+{
+	if (self->entries == NULL) {
+		PyErr_SetString(PyExc_RuntimeError,
+				"intern table is not initialized");
+		return NULL;
+	}
+
+	PyObject *string;
+	/* lexers on several threads may share a table */
+	Py_BEGIN_CRITICAL_SECTION(self);
+	string = interntable_intern_locked(self, data, size);
+	Py_END_CRITICAL_SECTION();
+	return string;
+}
+
+static PySequenceMethods interntable_as_sequence = {
+	.sq_length = (lenfunc)interntable_length,
+};
+
+PyTypeObject PyInternTable_Type = {
+	PyVarObject_HEAD_INIT(NULL, 0).tp_name = "clex.InternTable",
+	.tp_doc = "Strings shared between the tokens of the lexers using the "
+		  "table.",
+	.tp_basicsize = sizeof(PyInternTableObject),
+	.tp_itemsize = 0,
+	/* methods */
+	.tp_dealloc = (destructor)interntable_dealloc,
+	.tp_flags = Py_TPFLAGS_DEFAULT,
+
+	.tp_as_sequence = &interntable_as_sequence,
+	.tp_init = (initproc)interntable_init,
+	.tp_new = PyType_GenericNew,
+};
@@ -0,0 +1,31 @@
+#ifndef Py_INTERNTABLEOBJECT_H
+#define Py_INTERNTABLEOBJECT_H
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+typedef struct {
+	size_t hash;
+	PyObject* string;
+} InternEntry;
+
+typedef struct {
+	PyObject_HEAD
+	InternEntry* entries;
+	Py_ssize_t capacity;
+	Py_ssize_t size;
+} PyInternTableObject;
+
+PyAPI_DATA(PyTypeObject) PyInternTable_Type;
+
+/* Return a new reference to the string with the given ASCII contents,
+   creating and storing it on first use. */
+PyAPI_FUNC(PyObject*) PyInternTable_Intern(PyInternTableObject* self, const char* data, size_t size);
+
+#ifdef __cplusplus
+}
+#endif
+#endif /* !defined(Py_INTERNTABLEOBJECT_H) */
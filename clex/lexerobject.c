@@ -8,32 +8,49 @@
 
 #include "tokenobject.h"
 
+/* a scanned token, located in the text of the lexer */
+typedef struct {
+	TokenType type;
+	int line;
+	const char *start;
+	size_t size;
+} TokenSpan;
+
 /* lexer methods */
 
 static void lexer_dealloc(PyLexerObject *self)
 {
 	Py_XDECREF(self->text);
+	Py_XDECREF(self->interned);
 	Py_TYPE(self)->tp_free((PyObject *)self);
 }
 
 static int lexer_init(PyLexerObject *self, PyObject *args)
 {
-	PyObject *text = NULL, *tmp;
+	PyObject *text = NULL, *interned = NULL, *tmp;
 
-	if (!PyArg_ParseTuple(args, "U", &text))
+	if (!PyArg_ParseTuple(args, "U|O!", &text, &PyInternTable_Type,
+			      &interned))
 		return -1;
 
+	tmp = (PyObject *)self->interned;
+	self->interned = (PyInternTableObject *)Py_XNewRef(interned);
+	Py_XDECREF(tmp);
+
 	if (text) {
+		const char *source = PyUnicode_AsUTF8(text);
+		if (source == NULL)
+			return -1;
+
 		tmp = self->text;
 		Py_INCREF(text);
 		self->text = text;
 		Py_XDECREF(tmp);
 
-		const char *source = PyUnicode_AsUTF8(text);
-		self->start = source;
-		self->current = source;
+		self->scanner.start = source;
+		self->scanner.current = source;
 	}
-	self->line = 1;
+	self->scanner.line = 1;
 
 	return 0;
 }
@@ -41,11 +58,12 @@ static int lexer_init(PyLexerObject *self, PyObject *args)
 static PyMemberDef lexer_members[] = {
 	{ "text", T_OBJECT_EX, offsetof(PyLexerObject, text), 0,
 	  "internal text" },
-	{ "start", T_STRING, offsetof(PyLexerObject, start), 0,
+	{ "start", T_STRING, offsetof(PyLexerObject, scanner.start), 0,
 	  "start of current token" },
-	{ "current", T_STRING, offsetof(PyLexerObject, current), 0,
+	{ "current", T_STRING, offsetof(PyLexerObject, scanner.current), 0,
 	  "current char" },
-	{ "line", T_INT, offsetof(PyLexerObject, line), 0, "line number" },
+	{ "line", T_INT, offsetof(PyLexerObject, scanner.line), 0,
+	  "line number" },
 	{ NULL }
 };
 
@@ -97,67 +115,56 @@ static inline bool lexer_ishex_impl(char c)
 	       (c >= 'A' && c <= 'F');
 }
 
-static PyObject *lexer_ishex(PyLexerObject *self, PyObject *args)
-{
-	char c;
-	if (!PyArg_ParseTuple(args, "C", &c))
-		return NULL;
-
-	return PyBool_FromLong(lexer_ishex_impl(c));
-}
-
-static inline bool lexer_is_at_end_impl(PyLexerObject *self)
+static inline bool scanner_is_at_end(Scanner *scanner)
 {
-	return *self->current == '\0';
+	return *scanner->current == '\0';
 }
 
 static PyObject *lexer_is_at_end(PyLexerObject *self, PyObject *Py_UNUSED(args))
 {
-	return PyBool_FromLong(*self->current == '\0');
+	return PyBool_FromLong(scanner_is_at_end(&self->scanner));
 }
 
-static inline char lexer_advance_impl(PyLexerObject *self)
+static inline char scanner_advance(Scanner *scanner)
 {
-	return *self->current++;
+	return *scanner->current++;
 }
 
 static PyObject *lexer_advance(PyLexerObject *self, PyObject *Py_UNUSED(args))
 {
-	return Py_BuildValue("C", *self->current++);
+	return Py_BuildValue("C", scanner_advance(&self->scanner));
 }
 
-static inline char lexer_peek_impl(PyLexerObject *self)
+static inline char scanner_peek(Scanner *scanner)
 {
-	return *self->current;
+	return *scanner->current;
 }
 
 static PyObject *lexer_peek(PyLexerObject *self, PyObject *Py_UNUSED(args))
 {
-	PyObject *unicode = PyUnicode_FromOrdinal(*self->current);
+	PyObject *unicode = PyUnicode_FromOrdinal(scanner_peek(&self->scanner));
 	return unicode;
 }
 
-static inline char lexer_peek_next_impl(PyLexerObject *self)
+static inline char scanner_peek_next(Scanner *scanner)
 {
-	if (lexer_is_at_end_impl(self))
+	if (scanner_is_at_end(scanner))
 		return '\0';
-	return self->current[1];
+	return scanner->current[1];
 }
 
 static PyObject *lexer_peek_next(PyLexerObject *self, PyObject *args)
 {
-	if (lexer_is_at_end(self, args))
-		return PyUnicode_FromOrdinal('\0');
-	return PyUnicode_FromOrdinal(self->current[1]);
+	return PyUnicode_FromOrdinal(scanner_peek_next(&self->scanner));
 }
 
-static inline bool lexer_match_impl(PyLexerObject *self, char expected)
+static inline bool scanner_match(Scanner *scanner, char expected)
 {
-	if (lexer_is_at_end_impl(self))
+	if (scanner_is_at_end(scanner))
 		return false;
-	if (*self->current != expected)
+	if (*scanner->current != expected)
 		return false;
-	self->current++;
+	scanner->current++;
 	return true;
 }
 
@@ -167,16 +174,73 @@ static PyObject *lexer_match(PyLexerObject *self, PyObject *args)
 	if (!PyArg_ParseTuple(args, "C", &expected))
 		return NULL;
 
-	if (lexer_is_at_end(self, args))
-		Py_RETURN_FALSE;
-	if (*self->current != expected)
-		Py_RETURN_FALSE;
-	self->current++;
-	Py_RETURN_TRUE;
+	return PyBool_FromLong(scanner_match(&self->scanner, expected));
+}
+
+static inline bool is_interned_type(TokenType type)
+{
+	/* numbers are mostly unique addresses, which would only bloat the
+	   table */
+	return type != TOKEN_HEX && type != TOKEN_NUMBER && type != TOKEN_ERROR;
+}
+
+/* Returns the value of a HEX or NUMBER token, None if it has none, or NULL
+   on error. */
+static PyObject *lexer_make_value(TokenType type, const char *start,
+				  size_t size)
+{
+	int base;
+	if (type == TOKEN_HEX) {
+		/* the scanner also accepts an 'x' after other digits */
+		if (size < 3 || start[0] != '0')
+			Py_RETURN_NONE;
+		base = 16;
+		start += 2;
+		size -= 2;
+	} else if (type == TOKEN_NUMBER) {
+		base = 10;
+	} else {
+		Py_RETURN_NONE;
+	}
+
+	uint64_t value = 0;
+	size_t i;
+	for (i = 0; i < size; i++) {
+		char c = start[i];
+		unsigned digit;
+		if (c >= '0' && c <= '9')
+			digit = (unsigned)(c - '0');
+		else if (base == 16 && c >= 'a' && c <= 'f')
+			digit = (unsigned)(c - 'a' + 10);
+		else if (base == 16 && c >= 'A' && c <= 'F')
+			digit = (unsigned)(c - 'A' + 10);
+		else
+			Py_RETURN_NONE;
+		if (value > (UINT64_MAX - digit) / (unsigned)base)
+			break;
+		value = value * (unsigned)base + digit;
+	}
+	if (i == size)
+		return PyLong_FromUnsignedLongLong(value);
+
+	/* too large for 64 bits */
+	char *digits = PyMem_Malloc(size + 1);
+	if (digits == NULL)
+		return PyErr_NoMemory();
+	memcpy(digits, start, size);
+	digits[size] = '\0';
+	PyObject *result = PyLong_FromString(digits, NULL, base);
+	PyMem_Free(digits);
+	if (result == NULL && PyErr_ExceptionMatches(PyExc_ValueError)) {
+		PyErr_Clear();
+		Py_RETURN_NONE;
+	}
+	return result;
 }
 
-static inline PyObject *lexer_make_token_impl(PyLexerObject *self,
-					      TokenType type)
+static inline PyObject *lexer_make_token_impl(PyInternTableObject *interned,
+					      TokenType type, const char *start,
+					      size_t size, int line)
 {
 	PyTokenObject *token =
 		(PyTokenObject *)PyType_GenericNew(&PyToken_Type, NULL, NULL);
@@ -185,13 +249,30 @@ static inline PyObject *lexer_make_token_impl(PyLexerObject *self,
 		return NULL;
 	}
 
-	size_t size = (size_t)(self->current - self->start);
-
-	if (PyToken_Init(token, type, self->start, size, self->line) < 0) {
+	if (interned != NULL && is_interned_type(type)) {
+		PyObject *literal = PyInternTable_Intern(interned, start, size);
+		if (literal == NULL) {
+			Py_DECREF(token);
+			return NULL;
+		}
+		PyToken_InitLiteral(token, type, literal, line);
+		Py_DECREF(literal);
+	} else if (PyToken_Init(token, type, start, size, line) < 0) {
 		Py_DECREF(token);
 		return NULL;
 	}
 
+	if (type == TOKEN_HEX || type == TOKEN_NUMBER) {
+		PyObject *value = lexer_make_value(type, start, size);
+		if (value == NULL) {
+			Py_DECREF(token);
+			return NULL;
+		}
+		if (value != Py_None)
+			PyToken_SetValue(token, value);
+		Py_DECREF(value);
+	}
+
 	return (PyObject *)token;
 }
 
@@ -206,11 +287,12 @@ static PyObject *lexer_make_token(PyLexerObject *self, PyObject *args)
 		return NULL;
 
 	literal = PyUnicode_FromKindAndData(
-		1, self->start, (Py_ssize_t)(self->current - self->start));
+		1, self->scanner.start,
+		(Py_ssize_t)(self->scanner.current - self->scanner.start));
 	if (literal == NULL)
 		return NULL;
 
-	argList = Py_BuildValue("iOi", self->line, literal, type);
+	argList = Py_BuildValue("iOi", self->scanner.line, literal, type);
 	Py_DECREF(literal);
 	if (argList == NULL)
 		return NULL;
@@ -221,24 +303,24 @@ static PyObject *lexer_make_token(PyLexerObject *self, PyObject *args)
 	if (token == NULL)
 		return NULL;
 
-	self->start = self->current;
+	self->scanner.start = self->scanner.current;
 
 	return (PyObject *)token;
 }
 
-static inline void lexer_skip_whitespace_impl(PyLexerObject *self)
+static inline void scanner_skip_whitespace(Scanner *scanner)
 {
 	for (;;) {
-		char c = lexer_peek_impl(self);
+		char c = scanner_peek(scanner);
 		switch (c) {
 		case ' ':
 		case '\r':
 		case '\t':
-			lexer_advance_impl(self);
+			scanner_advance(scanner);
 			break;
 		case '\n':
-			self->line++;
-			lexer_advance_impl(self);
+			scanner->line++;
+			scanner_advance(scanner);
 			break;
 		default:
 			return;
@@ -249,35 +331,24 @@ static inline void lexer_skip_whitespace_impl(PyLexerObject *self)
 static PyObject *lexer_skip_whitespace(PyLexerObject *self,
 				       PyObject *Py_UNUSED(args))
 {
-	lexer_skip_whitespace_impl(self);
+	scanner_skip_whitespace(&self->scanner);
 	Py_RETURN_NONE;
 }
 
-static inline PyObject *lexer_number_impl(PyLexerObject *self)
+static inline TokenType scanner_number(Scanner *scanner)
 {
-	while (lexer_isdigit_impl(lexer_peek_impl(self)))
-		lexer_advance_impl(self);
+	while (lexer_isdigit_impl(scanner_peek(scanner)))
+		scanner_advance(scanner);
 
-	return lexer_make_token_impl(self, TOKEN_NUMBER);
+	return TOKEN_NUMBER;
 }
 
-static PyObject *lexer_number(PyLexerObject *self, PyObject *Py_UNUSED(args))
+static inline TokenType scanner_hexadecimal(Scanner *scanner)
 {
-	return lexer_number_impl(self);
-}
-
-static inline PyObject *lexer_hexadecimal_impl(PyLexerObject *self)
-{
-	while (lexer_ishex_impl(lexer_peek_impl(self)))
-		lexer_advance_impl(self);
+	while (lexer_ishex_impl(scanner_peek(scanner)))
+		scanner_advance(scanner);
 
-	return lexer_make_token_impl(self, TOKEN_HEX);
-}
-
-static PyObject *lexer_hexadecimal(PyLexerObject *self,
-				   PyObject *Py_UNUSED(args))
-{
-	return lexer_hexadecimal_impl(self);
+	return TOKEN_HEX;
 }
 
 static inline bool is_ident_char(char c)
@@ -285,140 +356,202 @@ static inline bool is_ident_char(char c)
 	return lexer_isalnum_impl(c) || c == '_';
 }
 
-static inline void eat_identifier_simple(PyLexerObject *self)
+static inline void eat_identifier_simple(Scanner *scanner)
 {
-	while (is_ident_char(lexer_peek_impl(self)))
-		lexer_advance_impl(self);
+	while (is_ident_char(scanner_peek(scanner)))
+		scanner_advance(scanner);
 }
 
-static inline void eat_identifier_parameterized(PyLexerObject *self)
+static inline void eat_identifier_parameterized(Scanner *scanner)
 {
-	if (lexer_peek_impl(self) != '<')
+	if (scanner_peek(scanner) != '<')
 		return;
 
 	// parmeterized identifier
-	lexer_advance_impl(self); // '<'
+	scanner_advance(scanner); // '<'
 	int nestedness = 1;
 
 	char c;
-	while (c = lexer_peek_impl(self), c != '\0' && nestedness != 0) {
+	while (c = scanner_peek(scanner), c != '\0' && nestedness != 0) {
 		if (c == '<')
 			++nestedness;
 		if (c == '>')
 			--nestedness;
 
-		lexer_advance_impl(self);
+		scanner_advance(scanner);
 	}
 	if (c == '>')
-		lexer_advance_impl(self);
+		scanner_advance(scanner);
 }
 
-static inline void eat_identifier_complex(PyLexerObject *self)
+static inline void eat_identifier_complex(Scanner *scanner)
 {
-	eat_identifier_simple(self);
-	eat_identifier_parameterized(self);
+	eat_identifier_simple(scanner);
+	eat_identifier_parameterized(scanner);
 }
 
-static inline PyObject *lexer_identifier_impl(PyLexerObject *self)
+static inline TokenType scanner_identifier(Scanner *scanner)
 {
-	eat_identifier_simple(self);
+	eat_identifier_simple(scanner);
 
-	if (lexer_peek_impl(self) == '.') { // module
-		lexer_advance_impl(self);
-		eat_identifier_simple(self);
-		return lexer_make_token_impl(self, TOKEN_MODULE);
+	if (scanner_peek(scanner) == '.') { // module
+		scanner_advance(scanner);
+		eat_identifier_simple(scanner);
+		return TOKEN_MODULE;
 	}
 
-	while (lexer_peek_impl(self) == ':' &&
-	       lexer_peek_next_impl(self) == ':') { // namespace binder
-		lexer_advance_impl(self);
-		lexer_advance_impl(self);
+	while (scanner_peek(scanner) == ':' &&
+	       scanner_peek_next(scanner) == ':') { // namespace binder
+		scanner_advance(scanner);
+		scanner_advance(scanner);
 
-		eat_identifier_complex(self);
+		eat_identifier_complex(scanner);
 	}
 
-	return lexer_make_token_impl(self, TOKEN_IDENTIFIER);
-}
-
-static PyObject *lexer_identifier(PyLexerObject *self,
-				  PyObject *Py_UNUSED(args))
-{
-	return lexer_identifier_impl(self);
+	return TOKEN_IDENTIFIER;
 }
 
-static inline void lexer_skip_braced_expression_impl(PyLexerObject *self)
+static inline void scanner_skip_braced_expression(Scanner *scanner)
 {
-	if (lexer_peek_impl(self) != '(')
+	if (scanner_peek(scanner) != '(')
 		return;
 
-	lexer_advance_impl(self);
-	char c = lexer_peek_impl(self);
+	scanner_advance(scanner);
+	char c = scanner_peek(scanner);
 	while (c != '\0' && c != ')')
-		c = lexer_advance_impl(self);
+		c = scanner_advance(scanner);
 
 	if (c == ')')
-		lexer_advance_impl(self);
+		scanner_advance(scanner);
 }
 
-static inline PyObject *lexer_scan_token_impl(PyLexerObject *self)
+/* Scan the next token, leaving its literal between scanner->start and
+   scanner->current. Touches no Python objects, so it can run without the
+   GIL. */
+static TokenType scanner_scan(Scanner *scanner)
 {
-	lexer_skip_whitespace_impl(self);
-	lexer_skip_braced_expression_impl(self);
-	lexer_skip_whitespace_impl(self);
+	scanner_skip_whitespace(scanner);
+	scanner_skip_braced_expression(scanner);
+	scanner_skip_whitespace(scanner);
 
-	self->start = self->current;
+	scanner->start = scanner->current;
 
-	if (lexer_is_at_end_impl(self))
-		return lexer_make_token_impl(self, TOKEN_EOF);
+	if (scanner_is_at_end(scanner))
+		return TOKEN_EOF;
 
-	char c = lexer_advance_impl(self);
+	char c = scanner_advance(scanner);
 
 	if (lexer_isdigit_impl(c)) {
-		return lexer_match_impl(self, 'x') ?
-			       lexer_hexadecimal_impl(self) :
-			       lexer_number_impl(self);
+		return scanner_match(scanner, 'x') ?
+			       scanner_hexadecimal(scanner) :
+			       scanner_number(scanner);
 	}
 
 	if (lexer_isalpha_impl(c) || c == '_') {
-		return lexer_identifier_impl(self);
+		return scanner_identifier(scanner);
 	}
 
 	switch (c) {
 	case '<':
-		return lexer_make_token_impl(self, TOKEN_LEFT_ANGLE);
+		return TOKEN_LEFT_ANGLE;
 	case '>':
-		return lexer_make_token_impl(self, TOKEN_RIGHT_ANGLE);
+		return TOKEN_RIGHT_ANGLE;
 	case ':':
-		return lexer_make_token_impl(self, lexer_match_impl(self, ':') ?
-							   TOKEN_DOUBLECOLON :
-							   TOKEN_COLON);
+		return scanner_match(scanner, ':') ? TOKEN_DOUBLECOLON :
+						     TOKEN_COLON;
 	case '`':
-		return lexer_make_token_impl(self, TOKEN_BACKTICK);
+		return TOKEN_BACKTICK;
 	case '\'':
-		return lexer_make_token_impl(self, TOKEN_APOSTROPHE);
+		return TOKEN_APOSTROPHE;
 	case '.':
-		return lexer_make_token_impl(self, TOKEN_DOT);
+		return TOKEN_DOT;
 	case ',':
-		return lexer_make_token_impl(self, TOKEN_COMMA);
+		return TOKEN_COMMA;
 	case '&':
-		return lexer_make_token_impl(self, TOKEN_AMPERSAND);
+		return TOKEN_AMPERSAND;
 	case '*':
-		return lexer_make_token_impl(self, TOKEN_ASTERISK);
+		return TOKEN_ASTERISK;
 	case '_':
-		return lexer_make_token_impl(self, TOKEN_UNDERSCORE);
+		return TOKEN_UNDERSCORE;
 	case '-':
-		return lexer_make_token_impl(self, lexer_match_impl(self, '>') ?
-							   TOKEN_ARROW :
-							   TOKEN_HYPHEN);
+		return scanner_match(scanner, '>') ? TOKEN_ARROW : TOKEN_HYPHEN;
 	}
 
-	return lexer_make_token_impl(self, TOKEN_ERROR);
+	return TOKEN_ERROR;
 }
 
 static PyObject *lexer_scan_token(PyLexerObject *self,
 				  PyObject *Py_UNUSED(args))
 {
-	return lexer_scan_token_impl(self);
+	Scanner *scanner = &self->scanner;
+	TokenType type = scanner_scan(scanner);
+	return lexer_make_token_impl(self->interned, type, scanner->start,
+				     (size_t)(scanner->current - scanner->start),
+				     scanner->line);
+}
+
+static PyObject *lexer_scan_tokens(PyLexerObject *self, PyObject *args)
+{
+	Py_ssize_t max_count;
+	if (!PyArg_ParseTuple(args, "n", &max_count))
+		return NULL;
+
+	if (max_count <= 0) {
+		PyErr_SetString(PyExc_ValueError, "max_count must be positive");
+		return NULL;
+	}
+	if (self->text == NULL) {
+		PyErr_SetString(PyExc_RuntimeError, "lexer has no text");
+		return NULL;
+	}
+
+	TokenSpan *spans = PyMem_New(TokenSpan, max_count);
+	if (spans == NULL)
+		return PyErr_NoMemory();
+
+	/* the text is immutable and kept alive by this reference, so it can be
+	   scanned without the GIL, on a copy of the scanning state */
+	PyObject *text = Py_NewRef(self->text);
+	Scanner scanner = self->scanner;
+	Py_ssize_t count = 0;
+
+	Py_BEGIN_ALLOW_THREADS
+	while (count < max_count) {
+		TokenType type = scanner_scan(&scanner);
+		if (type == TOKEN_EOF)
+			break;
+		spans[count++] = (TokenSpan){
+			.type = type,
+			.line = scanner.line,
+			.start = scanner.start,
+			.size = (size_t)(scanner.current - scanner.start),
+		};
+	}
+	Py_END_ALLOW_THREADS
+
+	/* unless the lexer was given another text in the meantime */
+	if (self->text == text)
+		self->scanner = scanner;
+
+	PyObject *tokens = PyList_New(count);
+	if (tokens == NULL)
+		goto done;
+
+	for (Py_ssize_t i = 0; i < count; i++) {
+		PyObject *token = lexer_make_token_impl(
+			self->interned, spans[i].type, spans[i].start,
+			spans[i].size, spans[i].line);
+		if (token == NULL) {
+			Py_CLEAR(tokens);
+			goto done;
+		}
+		PyList_SET_ITEM(tokens, i, token);
+	}
+
+done:
+	Py_DECREF(text);
+	PyMem_Free(spans);
+	return tokens;
 }
 
 static PyMethodDef lexer_methods[] = {
@@ -437,6 +570,9 @@ static PyMethodDef lexer_methods[] = {
 	{ "match", (PyCFunction)lexer_match, METH_VARARGS, NULL },
 	{ "make_token", (PyCFunction)lexer_make_token, METH_VARARGS, NULL },
 	{ "scan_token", (PyCFunction)lexer_scan_token, METH_VARARGS, NULL },
+	{ "scan_tokens", (PyCFunction)lexer_scan_tokens, METH_VARARGS,
+	  "Scan up to max_count tokens without holding the GIL. An empty list "
+	  "marks the end of the text." },
 	{ NULL }
 };
 
@@ -7,12 +7,21 @@ extern "C" {
 #define PY_SSIZE_T_CLEAN
 #include <Python.h>
 
+#include "interntable.h"
+
+/* scanning state, kept apart from the object so that it can be advanced
+   without holding the GIL */
 typedef struct {
-	PyObject_HEAD
-	PyObject* text;
 	const char* start;
 	const char* current;
 	int line;
+} Scanner;
+
+typedef struct {
+	PyObject_HEAD
+	PyObject* text;
+	PyInternTableObject* interned;
+	Scanner scanner;
 } PyLexerObject;
 
 PyAPI_DATA(PyTypeObject) PyLexer_Type;
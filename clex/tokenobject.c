@@ -7,6 +7,7 @@
 static int
 token_clear(PyTokenObject* self) {
 	Py_CLEAR(self->literal);
+	Py_CLEAR(self->value);
 	return 0;
 }
 
@@ -60,6 +61,7 @@ token_str(PyTokenObject* self) {
 static int
 token_traverse(PyTokenObject* self, visitproc visit, void* arg) {
 	Py_VISIT(self->literal);
+	Py_VISIT(self->value);
 	return 0;
 }
 
@@ -93,15 +95,23 @@ token_setliteral(PyTokenObject* self, PyObject* value, void* closure) {
 	return 0;
 }
 
+static PyObject*
+token_getvalue(PyTokenObject* self, void* closure) {
+	if (self->value == NULL)
+		Py_RETURN_NONE;
+	return Py_NewRef(self->value);
+}
+
 static PyGetSetDef token_getsetters[] = {
 	{"literal", (getter)token_getliteral, (setter)token_setliteral, "string literal", NULL},
+	{"value", (getter)token_getvalue, NULL, "integer value of hex and number tokens", NULL},
 	{NULL}
 };
 
 int
 PyToken_Init(PyTokenObject* self, TokenType type, const char* literal, size_t size, int line)
 {
-	PyObject* unicode = NULL, *tmp;
+	PyObject* unicode = NULL;
 
 	unicode = PyUnicode_New(size, 1); // assume ascii
 	if (unicode == NULL)
@@ -109,12 +119,27 @@ PyToken_Init(PyTokenObject* self, TokenType type, const char* literal, size_t si
 	
 	memcpy(PyUnicode_DATA(unicode), literal, size);
 
-	tmp = self->literal;
-	self->literal = unicode;
+	PyToken_InitLiteral(self, type, unicode, line);
+	Py_DECREF(unicode);
+	return 0;
+}
+
+void
+PyToken_InitLiteral(PyTokenObject* self, TokenType type, PyObject* literal, int line)
+{
+	PyObject* tmp = self->literal;
+	self->literal = Py_NewRef(literal);
 	Py_XDECREF(tmp);
 	self->type = type;
 	self->line = line;
-	return 0;
+}
+
+void
+PyToken_SetValue(PyTokenObject* self, PyObject* value)
+{
+	PyObject* tmp = self->value;
+	self->value = Py_XNewRef(value);
+	Py_XDECREF(tmp);
 }
 
 static int
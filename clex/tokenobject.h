@@ -37,11 +37,14 @@ typedef struct {
 	PyObject_HEAD PyObject *literal;
 	TokenType type;
 	int line;
+	PyObject *value; /* int of HEX and NUMBER tokens, NULL otherwise */
 } PyTokenObject;
 
 PyAPI_DATA(PyTypeObject) PyToken_Type;
 
 PyAPI_FUNC(int) PyToken_Init(PyTokenObject *self, TokenType type, const char *literal, size_t size, int line);
+PyAPI_FUNC(void) PyToken_InitLiteral(PyTokenObject *self, TokenType type, PyObject *literal, int line);
+PyAPI_FUNC(void) PyToken_SetValue(PyTokenObject *self, PyObject *value);
 
 #ifdef __cplusplus
 }
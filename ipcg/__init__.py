@@ -0,0 +1,29 @@
+"""
+Resolves the class hierarchies of IDA Pro class-dumper output.
+
+    hierarchy = ipcg.load_game("dumps/gta5")
+    for view in hierarchy.iter_classes(name="CPed"):
+        print(view.module, view.size, [base.name for base in view.bases])
+"""
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .api import list_games, load_game
+    from .hierarchy import ClassView, Hierarchy, VirtualMethod
+
+__all__ = ["ClassView", "Hierarchy", "VirtualMethod", "list_games", "load_game"]
+
+
+# the API is imported on first use, so that importing a single ipcg module
+# does not load the parsers and resolver along with it
+def __getattr__(name: str) -> object:
+    if name in ("list_games", "load_game"):
+        from . import api
+
+        return getattr(api, name)
+    if name in ("ClassView", "Hierarchy", "VirtualMethod"):
+        from . import hierarchy
+
+        return getattr(hierarchy, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
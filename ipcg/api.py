@@ -0,0 +1,54 @@
+import asyncio
+import os
+from pathlib import Path
+
+from . import loader
+from .class_resolver import ClassResolver
+from .hierarchy import Hierarchy
+from .lexer import LexerBackend, get_lexer_provider
+from .module_linker import link_modules
+
+
+def resolve_game(
+    inheritance: Path,
+    vtable: Path,
+    *,
+    lexer: LexerBackend = "pygments",
+    module: str = "",
+) -> Hierarchy:
+    """
+    Parse, link and resolve the given inheritance and vtable dumps, or only
+    their blocks of `module` if given.
+    """
+    class_modules, vtable_modules = asyncio.run(
+        loader.load_game(inheritance, vtable, get_lexer_provider(lexer), module)
+    )
+    linked_modules = link_modules(class_modules, vtable_modules, module)
+
+    resolver = ClassResolver()
+    resolver.resolve(linked_modules)
+    return Hierarchy(linked_modules)
+
+
+def load_game(
+    path: Path | str, *, lexer: LexerBackend = "pygments", module: str = ""
+) -> Hierarchy:
+    """
+    Load the game whose dumps are in the directory `path`, or only its module
+    `module` if given.
+    """
+    directory = Path(path)
+    inheritance = loader.find_dump_file(directory, "inheritance.txt")
+    vtable = loader.find_dump_file(directory, "vtable.txt")
+    for dump in (inheritance, vtable):
+        if not dump.is_file():
+            raise FileNotFoundError(f"{dump} does not exist")
+    return resolve_game(inheritance, vtable, lexer=lexer, module=module)
+
+
+def list_games(path: Path | str) -> list[str]:
+    """
+    Return the names of the game directories in the class-dumper directory
+    `path`.
+    """
+    return next(os.walk(path))[1]
@@ -1,6 +1,63 @@
 import sys
+from collections.abc import Iterator
+from dataclasses import dataclass, field
 
-from .statement import Class, LinkedModuleBlock, Statement, VTable
+from .size_inference import infer_sizes
+from .statement import Class, LinkedModuleBlock, Statement, VTable, VTableBindings
+
+# a step of resolving a class: either one of its bases, which is resolved in
+# turn, or a (path, vtable) pair binding a vtable to a base that was already
+# among the bases of a previous one
+type _Step = _BaseStep | tuple[tuple[Class, ...], VTable | None]
+
+
+@dataclass(slots=True)
+class _Layout:
+    """
+    The resolved bases of a class, shared by every instance of the class,
+    and the steps that led to them.
+    """
+
+    bases: list[Class]
+    steps: list[_Step]
+
+
+@dataclass(frozen=True, slots=True)
+class _BaseStep:
+    """
+    A base added to a layout, with its own layout and, for a class of the
+    module, its class statement.
+    """
+
+    cls: Class
+    layout: _Layout
+    symbol: Class | None
+
+
+@dataclass(slots=True)
+class _VisitFrame:
+    """
+    A base being visited, or the class statement for no `step`, with the
+    index of the step of its layout being taken and the vtables bound so far.
+    """
+
+    step: _BaseStep | None
+    steps: list[_Step]
+    is_unresolved: bool
+    index: int = 0
+    vtable_bindings: VTableBindings = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class _LayoutFrame:
+    identifier: str
+    bases: Iterator[Class]
+    symbol: Class | None
+    # the unresolved base of the class below whose layout is being built,
+    # and the vtable that class binds to it
+    base: Class | None = None
+    vtable: VTable | None = None
+    layout: _Layout = field(default_factory=lambda: _Layout([], []))
 
 
 class ClassResolver(Statement.Visitor):
@@ -9,6 +66,8 @@ class ClassResolver(Statement.Visitor):
         self._current_module_type_symbols: dict[str, Class] = {}
         self._current_module_vtable_symbols: dict[str, VTable] = {}
         self._current_module_vtable_owned_symbols: dict[tuple[str, str], VTable] = {}
+        self._layouts: dict[Class, _Layout] = {}
+        self._resolved_classes: set[Class] = set()
 
     def resolve(self, linked_modules: list[LinkedModuleBlock]) -> None:
         linked_module: LinkedModuleBlock
@@ -20,31 +79,13 @@ class ClassResolver(Statement.Visitor):
 
     def visit_linked_module_block(self, linked_module: LinkedModuleBlock) -> None:
         self._current_module = linked_module
-        self._current_module_type_symbols = {
-            class_statement.identifier: class_statement
-            for class_statement in linked_module.classes
-        }
-
-        # 34 is length of anon-namespace string
-        # 11 is length of vftable string
-        self._current_module_vtable_symbols = {
-            vtable.identifier[:-34]
-            if vtable.identifier.endswith("::`anonymous namespace'::`vftable'")
-            else vtable.identifier[:-11]: vtable
-            for vtable in linked_module.vtables
-            if not vtable.owner
-        }
-
-        self._current_module_vtable_owned_symbols = {
-            (
-                vtable.owner,
-                vtable.identifier[:-34]
-                if vtable.identifier.endswith("::`anonymous namespace'::`vftable'")
-                else vtable.identifier[:-11],
-            ): vtable
-            for vtable in linked_module.vtables
-            if vtable.owner
-        }
+        # built by the parsers, and only read here
+        self._current_module_type_symbols = linked_module.type_symbols
+        self._current_module_vtable_symbols = linked_module.vtable_symbols
+        self._current_module_vtable_owned_symbols = linked_module.vtable_owned_symbols
+
+        self._layouts = {}
+        self._resolved_classes = set()
 
         cls: Class
         for cls in linked_module.classes:
@@ -54,48 +95,216 @@ class ClassResolver(Statement.Visitor):
                 print(f"{cls.identifier} may be faulty", file=sys.stderr)
                 cls.is_faulty = True
 
-    def visit_class(self, cls: Class) -> None:
-        bases: list[Class] = []
-        for base in cls.bases:
-            vtable = self._find_vtable_with_owner(base.identifier, cls.identifier)
-
-            if retrieved_base := self._get_base(bases, base):
-                if retrieved_base.vtable and vtable:
-                    self._override_vtable_function_names(retrieved_base.vtable, vtable)
-                retrieved_base.vtable = vtable
-                continue
+        # the sizes follow from all the resolved classes together
+        infer_sizes(linked_module.classes)
 
-            if base.identifier in self._current_module_type_symbols:
-                new_class: Class = self._current_module_type_symbols[
-                    base.identifier
-                ].clone()
-                new_class.offset = base.offset
-                new_class.vtable = vtable
-                bases.append(new_class)
-                self.visit_class(new_class)
-            else:
-                base.vtable = vtable
-                bases.append(base)
-                self.visit_class(base)
+    def visit_class(self, cls: Class) -> None:
+        frames: list[_VisitFrame] = []
+        try:
+            layout = self._get_layout(cls)
+            vtable_bindings = self._visit_bases(layout, frames)
+        except IndexError:
+            # the bases keep what was resolved of them, so a faulty class is
+            # printed as far as it could be resolved
+            cls.bases, cls.vtable_bindings = self._get_partial_bases(cls, frames)
+            raise
 
         if not cls.vtable:
             cls.vtable = self._find_vtable_without_owner(cls.identifier)
 
-        self._adjust_sizeof_bases(bases)
-
-        sizeof_bases: int = self._calculate_sizeof_bases(bases)
-
-        if not sizeof_bases and cls.vtable:
-            sizeof_bases = 8
-
-        cls.bases = bases
-        cls.set_size(sizeof_bases, False)
+        cls.bases = layout.bases
+        cls.vtable_bindings = vtable_bindings
+        self._resolved_classes.add(cls)
 
         # self.__print_vftable_function_names(cls)
         # Update vtable methods
-        self._set_vtable_function_names(cls)
+        self._set_vtable_function_names(cls, vtable_bindings)
         # self.__print_vftable_function_names(cls)
 
+    def _get_layout(self, cls: Class) -> _Layout:
+        """
+        Resolve the structure of `cls`, whose bases are still unresolved.
+        Bases that are classes of the module are instances sharing the layout
+        of that class, so a layout is built once however often it is used,
+        and the unresolved bases are left untouched. Other bases share the
+        layout of the same parsed base, which identical bases are since the
+        parser shares them.
+        """
+        if cls in self._layouts:
+            return self._layouts[cls]
+
+        # the layouts of the bases are built before the layout of the class
+        # that needs them, on an explicit stack to allow for any depth
+        stack = [_LayoutFrame(cls.identifier, iter(cls.bases), cls)]
+        while True:
+            frame = stack[-1]
+            for base in frame.bases:
+                vtable = self._find_vtable_with_owner(base.identifier, frame.identifier)
+
+                if path := self._get_base(frame.layout.bases, base):
+                    frame.layout.steps.append((path, vtable))
+                    continue
+
+                if base.identifier not in self._current_module_type_symbols:
+                    if base in self._layouts:
+                        self._add_base(frame.layout, base, vtable, self._layouts[base])
+                        continue
+                    stack.append(
+                        _LayoutFrame(base.identifier, iter(base.bases), None, base, vtable)
+                    )
+                    break
+
+                symbol = self._current_module_type_symbols[base.identifier]
+                if symbol in self._layouts:
+                    self._add_base(frame.layout, base, vtable, self._layouts[symbol])
+                    continue
+                if any(symbol is other.symbol for other in stack):
+                    # only classes with the same name can inherit from
+                    # each other, which is left for the caller to report
+                    raise IndexError(symbol.identifier)
+                stack.append(
+                    _LayoutFrame(symbol.identifier, iter(symbol.bases), symbol, base, vtable)
+                )
+                break
+            else:
+                _ = stack.pop()
+                if frame.symbol:
+                    self._layouts[frame.symbol] = frame.layout
+                elif frame.base:
+                    self._layouts[frame.base] = frame.layout
+                if not frame.base:
+                    return frame.layout
+                self._add_base(stack[-1].layout, frame.base, frame.vtable, frame.layout)
+
+    def _add_base(
+        self, layout: _Layout, base: Class, vtable: VTable | None, base_layout: _Layout
+    ) -> None:
+        new_class = Class(base.identifier, base_layout.bases, base.offset, 0, vtable)
+
+        if not new_class.vtable:
+            new_class.vtable = self._find_vtable_without_owner(base.identifier)
+
+        layout.bases.append(new_class)
+        layout.steps.append(
+            _BaseStep(
+                new_class,
+                base_layout,
+                self._current_module_type_symbols.get(base.identifier),
+            )
+        )
+
+    def _visit_bases(self, layout: _Layout, frames: list[_VisitFrame]) -> VTableBindings:
+        """
+        Name the vtable functions of the bases of an unresolved instance of
+        `layout` and return the vtables the instance binds to its bases.
+        Bases that were found twice are gone from the resolved bases of a
+        class, so instances of an already resolved class no longer bind
+        vtables to them. The bases being visited are kept in `frames`, where
+        they are left when naming fails.
+        """
+        # bases are visited in post-order, and a base is only popped once its
+        # functions are named
+        frames.append(_VisitFrame(None, layout.steps, True))
+        while True:
+            frame = frames[-1]
+            if frame.index < len(frame.steps):
+                step = frame.steps[frame.index]
+                if isinstance(step, _BaseStep):
+                    is_unresolved = frame.is_unresolved
+                    if step.symbol:
+                        is_unresolved = step.symbol not in self._resolved_classes
+                    frames.append(_VisitFrame(step, step.layout.steps, is_unresolved))
+                    continue
+
+                if frame.is_unresolved:
+                    path, vtable = step
+                    if path in frame.vtable_bindings:
+                        retrieved_vtable = frame.vtable_bindings[path]
+                    else:
+                        retrieved_vtable = path[-1].vtable
+                    if retrieved_vtable and vtable:
+                        self._override_vtable_function_names(retrieved_vtable, vtable)
+                    frame.vtable_bindings[path] = vtable
+                frame.index += 1
+                continue
+
+            if not frame.step:
+                return frame.vtable_bindings
+            self._set_vtable_function_names(frame.step.cls, frame.vtable_bindings)
+            _ = frames.pop()
+            derived = frames[-1]
+            for path, vtable in frame.vtable_bindings.items():
+                derived.vtable_bindings[(frame.step.cls, *path)] = vtable
+            derived.index += 1
+
+    def _get_partial_bases(
+        self, cls: Class, frames: list[_VisitFrame]
+    ) -> tuple[list[Class], VTableBindings]:
+        """
+        Return the bases of the faulty `cls` as far as `frames` got in
+        resolving them, and the vtables bound to them so far. Visited bases
+        that are not classes of the module are kept resolved, and the one
+        being visited keeps its vtable. All other bases are copies of the
+        parsed ones, since those are shared with other modules.
+        """
+        if len(frames) > 1 and frames[-1].index == len(frames[-1].steps):
+            # resolved all the same, only its functions could not be named
+            failed = frames.pop()
+            assert failed.step
+            for path, vtable in failed.vtable_bindings.items():
+                frames[-1].vtable_bindings[(failed.step.cls, *path)] = vtable
+            frames[-1].index += 1
+
+        partial_bases = [self._copy_parsed(base) for base in cls.bases]
+        vtable_bindings: VTableBindings = {}
+        identifier = cls.identifier
+        parsed_bases = cls.bases
+        bases = partial_bases
+        path: tuple[Class, ...] = ()
+        for depth, frame in enumerate(frames):
+            is_visiting = depth + 1 < len(frames)
+            for index, parsed_base in enumerate(parsed_bases):
+                step = frame.steps[index]
+                if not isinstance(step, _BaseStep) or step.symbol:
+                    continue
+                if index < frame.index:
+                    bases[index] = step.cls
+                elif index == frame.index and is_visiting:
+                    # the base being visited, filled in from the next frame
+                    vtable = self._find_vtable_with_owner(parsed_base.identifier, identifier)
+                    bases[index] = Class(parsed_base.identifier, [], parsed_base.offset, 0, vtable)
+            for bound_path, vtable in frame.vtable_bindings.items():
+                vtable_bindings[(*path, *bound_path)] = vtable
+
+            if not is_visiting:
+                break
+            step = frame.steps[frame.index]
+            if not isinstance(step, _BaseStep) or step.symbol:
+                break
+            parsed_base = parsed_bases[frame.index]
+            base = bases[frame.index]
+            base.bases = [self._copy_parsed(next_base) for next_base in parsed_base.bases]
+            identifier = parsed_base.identifier
+            parsed_bases = parsed_base.bases
+            bases = base.bases
+            path = (*path, base)
+        return partial_bases, vtable_bindings
+
+    @staticmethod
+    def _copy_parsed(base: Class) -> Class:
+        """
+        Copy the parsed `base` and its bases, which other modules share.
+        """
+        copy = Class(base.identifier, [], base.offset, 0)
+        stack = [(base, copy)]
+        while stack:
+            parsed, copied = stack.pop()
+            for parsed_base in parsed.bases:
+                copied_base = Class(parsed_base.identifier, [], parsed_base.offset, 0)
+                copied.bases.append(copied_base)
+                stack.append((parsed_base, copied_base))
+        return copy
+
     @staticmethod
     def __print_vftable_function_names(cls: Class) -> None:
         if not cls.vtable:
@@ -126,36 +335,34 @@ class ClassResolver(Statement.Visitor):
             if cls_entry.address != entry.address and owner_cls:
                 cls_entry.function.implementer = owner_cls
 
-    @staticmethod
-    def _calculate_sizeof_bases(bases: list[Class]) -> int:
-        if len(bases):
-            return bases[-1].offset + bases[-1].get_size()
-        return 0
-
     def _set_vtable_function_names(
-        self, cls: Class
+        self, cls: Class, vtable_bindings: VTableBindings
     ) -> None:  # class should (maybe) not take ownership of nullsub method, since it can be shared
         if not cls.vtable:
             return
         if not len(cls.bases):  # redoes vtable init, should check for repetition
             for entry in cls.vtable.vtable_entry_list:
-                entry.function.identifier = f"{cls.identifier}::Function{entry.index}"
+                entry.function.identifier = self._get_function_name(cls, entry.index)
                 entry.function.definer = cls
                 entry.function.implementer = cls
         else:
             # find first base class with same offset that has a vtable
             valid_base: Class = cls.bases[0]
-            while not valid_base.vtable:
+            path: tuple[Class, ...] = (valid_base,)
+            valid_vtable = vtable_bindings.get(path, valid_base.vtable)
+            while not valid_vtable:
                 if not len(valid_base.bases):
-                    if valid_base.vtable is None:
+                    if valid_vtable is None:
                         for entry in cls.vtable.vtable_entry_list:
-                            entry.function.identifier = (
-                                f"{cls.identifier}::Function{entry.index}"
+                            entry.function.identifier = self._get_function_name(
+                                cls, entry.index
                             )
                             entry.function.definer = cls
                             entry.function.implementer = cls
                     return
                 valid_base = valid_base.bases[0]
+                path += (valid_base,)
+                valid_vtable = vtable_bindings.get(path, valid_base.vtable)
 
             owner_cls = None
             if (
@@ -166,7 +373,7 @@ class ClassResolver(Statement.Visitor):
             elif cls.vtable.owner:
                 return
 
-            for entry in valid_base.vtable.vtable_entry_list:
+            for entry in valid_vtable.vtable_entry_list:
                 try:
                     cls_entry = cls.vtable.vtable_entry_list[entry.index]
                 except IndexError:
@@ -180,8 +387,8 @@ class ClassResolver(Statement.Visitor):
                 else:
                     cls_entry.function.implementer = cls
 
-            for entry in cls.vtable.vtable_entry_list[valid_base.vtable.vtable_count :]:
-                entry.function.identifier = f"{cls.identifier}::Function{entry.index}"
+            for entry in cls.vtable.vtable_entry_list[valid_vtable.vtable_count :]:
+                entry.function.identifier = self._get_function_name(cls, entry.index)
                 entry.function.definer = cls
                 if owner_cls:
                     entry.function.implementer = owner_cls
@@ -189,7 +396,8 @@ class ClassResolver(Statement.Visitor):
                     entry.function.implementer = cls
 
             for valid_base in cls.bases[1:]:
-                if not valid_base.vtable:
+                valid_vtable = vtable_bindings.get((valid_base,), valid_base.vtable)
+                if not valid_vtable:
                     continue
                 if valid_base.identifier not in self._current_module_vtable_symbols:
                     continue
@@ -200,16 +408,17 @@ class ClassResolver(Statement.Visitor):
                 for entry in (
                     established_vtable.vtable_entry_list
                 ):  # if cls_entry == entry, then continue
-                    cls_entry = valid_base.vtable.vtable_entry_list[entry.index]
+                    cls_entry = valid_vtable.vtable_entry_list[entry.index]
                     if cls_entry.address == entry.address:
                         cls_entry.function.implementer = entry.function.implementer
                     else:
                         cls_entry.function.implementer = cls
 
     @staticmethod
-    def _adjust_sizeof_bases(bases: list[Class]) -> None:
-        for index, base in enumerate(bases[1:], start=1):
-            bases[index - 1].set_size(base.offset - bases[index - 1].offset, True)
+    def _get_function_name(cls: Class, index: int) -> str:
+        # the same classes in other modules name their functions alike, so
+        # the names are shared rather than built for every vtable
+        return sys.intern(f"{cls.identifier}::Function{index}")
 
     def _find_vtable_without_owner(self, identifier: str) -> VTable | None:
         if identifier not in self._current_module_vtable_symbols:
@@ -222,13 +431,25 @@ class ClassResolver(Statement.Visitor):
         return self._current_module_vtable_owned_symbols[(owner, identifier)]
 
     @staticmethod
-    def _get_base(classes: list[Class], base: Class) -> Class | None:
-        cls: Class
+    def _get_base(classes: list[Class], base: Class) -> tuple[Class, ...] | None:
+        """
+        Return the path to the first class among `classes` and their bases
+        with the identifier of `base`, searching depth-first.
+        """
+        # bases are only added when they are not among the previous ones, so a
+        # match among `classes` is the first one depth-first as well
         for cls in classes:
             if cls.identifier == base.identifier:
-                return cls
-            else:
-                retrieved_base = ClassResolver._get_base(cls.bases, base)
-                if retrieved_base:
-                    return retrieved_base
+                return (cls,)
+
+        path: list[Class] = []
+        stack: list[tuple[int, Class]] = [(0, cls) for cls in reversed(classes)]
+        while stack:
+            depth, cls = stack.pop()
+            del path[depth:]
+            path.append(cls)
+            if depth and cls.identifier == base.identifier:
+                return tuple(path)
+            for next_base in reversed(cls.bases):
+                stack.append((depth + 1, next_base))
         return None
@@ -8,3 +8,7 @@ class ParseException(BaseException):
 
 class NameAnalyzerException(BaseException):
     pass
+
+
+class StaleIndexException(BaseException):
+    pass
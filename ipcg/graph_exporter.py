@@ -0,0 +1,259 @@
+import json
+from collections.abc import Iterator
+from typing import Literal, TextIO, assert_never, override
+from xml.sax.saxutils import escape
+
+from .statement import Class, LinkedModuleBlock, Statement, VTable
+
+type GraphFormat = Literal["jsonl", "dot", "graphml"]
+
+
+class GraphWriter:
+    """
+    Streams the records of a resolved hierarchy to a text file. Classes and
+    vtables are referred to by integer ids, so a base class is written once
+    and every derived class only points at it. A base class is shared by the
+    classes deriving from it, so the vtables a class statement binds to its
+    bases are written as bindings, keyed by the statement and the ids of the
+    bases along the path to the base.
+    """
+
+    def __init__(self, output: TextIO) -> None:
+        self.output = output
+
+    def begin(self) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def write_module(self, module: str) -> None:
+        pass
+
+    def write_class(
+        self, node_id: int, module: str, cls: Class, vtable_id: int | None
+    ) -> None:
+        pass
+
+    def write_vtable(self, vtable_id: int, module: str, vtable: VTable) -> None:
+        pass
+
+    def write_base(self, node_id: int, base_id: int, offset: int) -> None:
+        pass
+
+    def write_binding(self, node_id: int, path: tuple[int, ...], vtable_id: int) -> None:
+        pass
+
+
+class JsonLinesWriter(GraphWriter):
+    def _write(self, record: dict[str, object]) -> None:
+        _ = self.output.write(json.dumps(record, separators=(",", ":")))
+        _ = self.output.write("\n")
+
+    @override
+    def write_module(self, module: str) -> None:
+        self._write({"kind": "module", "name": module})
+
+    @override
+    def write_class(
+        self, node_id: int, module: str, cls: Class, vtable_id: int | None
+    ) -> None:
+        self._write(
+            {
+                "kind": "class",
+                "id": node_id,
+                "module": module,
+                "name": cls.identifier,
+                "size": cls.get_size(),
+                "determined": cls.is_determined_size(),
+                "faulty": cls.is_faulty,
+                "vtable": vtable_id,
+            }
+        )
+
+    @override
+    def write_vtable(self, vtable_id: int, module: str, vtable: VTable) -> None:
+        self._write(
+            {
+                "kind": "vtable",
+                "id": vtable_id,
+                "module": module,
+                "name": vtable.identifier,
+                "owner": vtable.owner,
+                "address": vtable.address,
+                "relative_address": vtable.relative_address,
+                "entries": [
+                    [entry.index, entry.relative_address, entry.function.identifier]
+                    for entry in vtable.vtable_entry_list
+                ],
+            }
+        )
+
+    @override
+    def write_base(self, node_id: int, base_id: int, offset: int) -> None:
+        self._write({"kind": "base", "class": node_id, "base": base_id, "offset": offset})
+
+    @override
+    def write_binding(self, node_id: int, path: tuple[int, ...], vtable_id: int) -> None:
+        self._write({"kind": "binding", "class": node_id, "path": path, "vtable": vtable_id})
+
+
+class DotWriter(GraphWriter):
+    @override
+    def begin(self) -> None:
+        _ = self.output.write("digraph ipcg {\n")
+
+    @override
+    def end(self) -> None:
+        _ = self.output.write("}\n")
+
+    @override
+    def write_class(
+        self, node_id: int, module: str, cls: Class, vtable_id: int | None
+    ) -> None:
+        label = json.dumps(f"{cls.identifier}\n{module}\nsize 0x{cls.get_size():X}")
+        _ = self.output.write(f"\tc{node_id} [label={label}];\n")
+
+    @override
+    def write_base(self, node_id: int, base_id: int, offset: int) -> None:
+        _ = self.output.write(f'\tc{node_id} -> c{base_id} [label="0x{offset:X}"];\n')
+
+
+class GraphMLWriter(GraphWriter):
+    _KEYS = (
+        ("name", "node", "string"),
+        ("module", "node", "string"),
+        ("size", "node", "long"),
+        ("determined", "node", "boolean"),
+        ("offset", "edge", "long"),
+    )
+
+    @override
+    def begin(self) -> None:
+        _ = self.output.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+        )
+        for name, domain, kind in self._KEYS:
+            _ = self.output.write(
+                f'\t<key id="{name}" for="{domain}" attr.name="{name}" attr.type="{kind}"/>\n'
+            )
+        _ = self.output.write('\t<graph edgedefault="directed">\n')
+
+    @override
+    def end(self) -> None:
+        _ = self.output.write("\t</graph>\n</graphml>\n")
+
+    @override
+    def write_class(
+        self, node_id: int, module: str, cls: Class, vtable_id: int | None
+    ) -> None:
+        _ = self.output.write(
+            f'\t\t<node id="c{node_id}">'
+            f'<data key="name">{escape(cls.identifier)}</data>'
+            f'<data key="module">{escape(module)}</data>'
+            f'<data key="size">{cls.get_size()}</data>'
+            f'<data key="determined">{str(cls.is_determined_size()).lower()}</data>'
+            "</node>\n"
+        )
+
+    @override
+    def write_base(self, node_id: int, base_id: int, offset: int) -> None:
+        _ = self.output.write(
+            f'\t\t<edge source="c{node_id}" target="c{base_id}">'
+            f'<data key="offset">{offset}</data></edge>\n'
+        )
+
+
+def get_graph_writer(graph_format: GraphFormat, output: TextIO) -> GraphWriter:
+    match graph_format:
+        case "jsonl":
+            return JsonLinesWriter(output)
+        case "dot":
+            return DotWriter(output)
+        case "graphml":
+            return GraphMLWriter(output)
+
+    assert_never(graph_format)
+
+
+class Exporter(Statement.Visitor):
+    def __init__(self, writer: GraphWriter) -> None:
+        self.writer = writer
+        self._current_module = ""
+        self._node_ids: dict[str, int] = {}
+        self._edges: set[tuple[int, int, int]] = set()
+        self._vtable_ids: dict[int, int] = {}
+        self._next_node_id = 0
+
+    def export(self, statements: list[LinkedModuleBlock]) -> None:
+        self.writer.begin()
+        for statement in statements:
+            self.execute(statement)
+        self.writer.end()
+
+    def execute(self, statement: Statement) -> None:
+        statement.accept(self)
+
+    @override
+    def visit_linked_module_block(self, statement: LinkedModuleBlock) -> None:
+        # node ids are per module, since a class name can be resolved
+        # differently in every module
+        self._current_module = statement.module
+        self._node_ids = {}
+        self._edges = set()
+        self.writer.write_module(statement.module)
+
+        for cls in statement.classes:
+            _ = self._get_node_id(cls, cls.vtable)
+        for cls in statement.classes:
+            self.visit_class(cls)
+
+    @override
+    def visit_class(self, statement: Class) -> None:
+        # a base node is shared by every class deriving from it, so it only
+        # gets the vtable of a class statement of its own, and every vtable
+        # bound along a path of the statement is written as a binding
+        node_id = self._get_node_id(statement, statement.vtable)
+        stack: list[tuple[int, tuple[Class, ...], tuple[int, ...], Iterator[Class]]] = [
+            (node_id, (), (), iter(statement.bases))
+        ]
+        while stack:
+            derived_id, path, path_ids, bases = stack[-1]
+            for base in bases:
+                base_id = self._get_node_id(base, None)
+                # bases are seen through every class deriving from them, but
+                # their edges are written once
+                if (edge := (derived_id, base_id, base.offset)) not in self._edges:
+                    self._edges.add(edge)
+                    self.writer.write_base(*edge)
+
+                base_path = (*path, base)
+                base_path_ids = (*path_ids, base_id)
+                if vtable := statement.get_base_vtable(base_path):
+                    vtable_id = self._get_vtable_id(vtable)
+                    self.writer.write_binding(node_id, base_path_ids, vtable_id)
+                stack.append((base_id, base_path, base_path_ids, iter(base.bases)))
+                break
+            else:
+                _ = stack.pop()
+
+    def _get_node_id(self, cls: Class, vtable: VTable | None) -> int:
+        if cls.identifier in self._node_ids:
+            return self._node_ids[cls.identifier]
+
+        node_id = self._next_node_id
+        self._next_node_id += 1
+        self._node_ids[cls.identifier] = node_id
+        vtable_id = self._get_vtable_id(vtable) if vtable else None
+        self.writer.write_class(node_id, self._current_module, cls, vtable_id)
+        return node_id
+
+    def _get_vtable_id(self, vtable: VTable) -> int:
+        if id(vtable) in self._vtable_ids:
+            return self._vtable_ids[id(vtable)]
+
+        vtable_id = len(self._vtable_ids)
+        self._vtable_ids[id(vtable)] = vtable_id
+        self.writer.write_vtable(vtable_id, self._current_module, vtable)
+        return vtable_id
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import final
+
+from .statement import Class, LinkedModuleBlock, VTable, VTableEntry
+
+
+@final
+class ClassView:
+    """
+    A class as laid out in a class statement: the statement itself, or one of
+    its bases reached through `path`. Bases are shared between the classes
+    deriving from them, so their vtables depend on the path they are seen
+    through.
+    """
+
+    __slots__ = ("module", "statement", "path")
+
+    def __init__(self, module: str, statement: Class, path: tuple[Class, ...] = ()) -> None:
+        self.module = module
+        self.statement = statement
+        self.path = path
+
+    @property
+    def cls(self) -> Class:
+        return self.path[-1] if self.path else self.statement
+
+    @property
+    def name(self) -> str:
+        return self.cls.identifier
+
+    @property
+    def size(self) -> int:
+        return self.cls.get_size()
+
+    @property
+    def is_determined_size(self) -> bool:
+        return self.cls.is_determined_size()
+
+    @property
+    def offset(self) -> int:
+        return self.cls.offset
+
+    @property
+    def vtable(self) -> VTable | None:
+        return self.statement.get_base_vtable(self.path)
+
+    @property
+    def bases(self) -> tuple[ClassView, ...]:
+        return tuple(
+            ClassView(self.module, self.statement, (*self.path, base))
+            for base in self.cls.bases
+        )
+
+    def iter_virtual_methods(self) -> Iterator[VTableEntry]:
+        """
+        Yield the entries of the vtable that the class defines or implements.
+        """
+        if not (vtable := self.vtable):
+            return
+        identifier = self.cls.identifier
+        for entry in vtable.vtable_entry_list:
+            function = entry.function
+            if (
+                function.implementer
+                and function.definer
+                and (
+                    function.implementer.identifier == identifier
+                    or function.definer.identifier == identifier
+                )
+            ):
+                yield entry
+
+
+@final
+@dataclass(slots=True)
+class VirtualMethod:
+    """
+    The implementations of one virtual method slot, which is named after its
+    definer and slot. Overriders are only collected until the default
+    implementation is found.
+    """
+
+    name: str
+    default: VTableEntry | None = None
+    overriders: list[VTableEntry] = field(default_factory=list)
+
+
+class Hierarchy:
+    """
+    The resolved classes of the linked modules of a game, with queries over
+    them. Class names are only unique within a module.
+    """
+
+    def __init__(self, linked_modules: list[LinkedModuleBlock]) -> None:
+        self.linked_modules = linked_modules
+
+    @property
+    def modules(self) -> list[str]:
+        return [linked_module.module for linked_module in self.linked_modules]
+
+    def iter_classes(
+        self, module: str | None = None, name: str | None = None
+    ) -> Iterator[ClassView]:
+        """
+        Yield the class statements, optionally only those of `module` or
+        those named `name`.
+        """
+        for linked_module in self._iter_modules(module):
+            for cls in linked_module.classes:
+                if name and cls.identifier != name:
+                    continue
+                yield ClassView(linked_module.module, cls)
+
+    def iter_class_definitions(
+        self, module: str | None = None, name: str | None = None
+    ) -> Iterator[ClassView]:
+        """
+        Yield the classes like `iter_classes`, each name only once, preceded
+        by those of their bases that were not yielded yet. Bases are yielded
+        as seen from the first class statement that reaches them.
+        """
+        established: set[str] = set()
+        for view in self.iter_classes(module, name):
+            cls = view.statement
+            if cls.identifier in established:
+                continue
+
+            # post-order, on an explicit stack
+            stack: list[tuple[tuple[Class, ...], Iterator[Class]]] = [((), iter(cls.bases))]
+            while stack:
+                path, bases = stack[-1]
+                for base in bases:
+                    if base.identifier not in established:
+                        stack.append(((*path, base), iter(base.bases)))
+                        break
+                else:
+                    _ = stack.pop()
+                    yield ClassView(view.module, cls, path)
+                    established.add(path[-1].identifier if path else cls.identifier)
+
+    def iter_virtual_methods(
+        self, module: str | None = None, definer: str | None = None
+    ) -> Iterator[VirtualMethod]:
+        """
+        Yield the virtual methods in the vtables of the classes, optionally
+        only those of `module` or those defined by the class `definer`.
+        Entries sharing an address are only counted once.
+        """
+        methods: dict[str, tuple[VirtualMethod, set[int]]] = {}
+        for view in self.iter_classes(module):
+            if not (vtable := view.statement.vtable):
+                continue
+            for entry in vtable.vtable_entry_list:
+                function = entry.function
+                if definer:
+                    # entries of faulty classes may be left without a definer
+                    if function.definer is None or function.definer.identifier != definer:
+                        continue
+
+                if function.identifier in methods:
+                    method, addresses = methods[function.identifier]
+                else:
+                    method, addresses = methods[function.identifier] = (
+                        VirtualMethod(function.identifier),
+                        set(),
+                    )
+                # vtables of derived classes repeat the entries they do not
+                # override
+                if entry.address in addresses:
+                    continue
+                addresses.add(entry.address)
+
+                if method.default is not None:
+                    continue
+                if function.implementer == function.definer:
+                    method.default = entry
+                else:
+                    method.overriders.append(entry)
+
+        for method, _ in methods.values():
+            yield method
+
+    def _iter_modules(self, module: str | None) -> Iterator[LinkedModuleBlock]:
+        for linked_module in self.linked_modules:
+            if module and linked_module.module != module:
+                continue
+            yield linked_module
@@ -0,0 +1,535 @@
+import os
+import sqlite3
+import sys
+from collections.abc import Iterable
+from pathlib import Path
+
+from .hierarchy import Hierarchy
+from .statement import Class, LinkedModuleBlock, Size, VTable, VTableEntry
+
+STORE_NAME = "hierarchy.ipcg.sqlite"
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+
+CREATE TABLE modules (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+
+-- the class statements of the modules and the bases they resolved to, which
+-- can be shared between the classes deriving from them
+CREATE TABLE classes (
+    id INTEGER PRIMARY KEY,
+    module_id INTEGER NOT NULL REFERENCES modules (id),
+    identifier TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    is_determined_size INTEGER NOT NULL,
+    is_faulty INTEGER NOT NULL,
+    vtable_id INTEGER REFERENCES vtables (id)
+);
+
+-- the class statements of the modules, in the order of the dump
+CREATE TABLE statements (
+    module_id INTEGER NOT NULL REFERENCES modules (id),
+    position INTEGER NOT NULL,
+    class_id INTEGER NOT NULL REFERENCES classes (id),
+    PRIMARY KEY (module_id, position)
+) WITHOUT ROWID;
+
+CREATE TABLE bases (
+    class_id INTEGER NOT NULL REFERENCES classes (id),
+    position INTEGER NOT NULL,
+    base_id INTEGER NOT NULL REFERENCES classes (id),
+    offset INTEGER NOT NULL,
+    PRIMARY KEY (class_id, position)
+) WITHOUT ROWID;
+
+-- the vtables a class binds to its bases, by the comma separated ids of the
+-- classes on the path to the base
+CREATE TABLE vtable_bindings (
+    class_id INTEGER NOT NULL REFERENCES classes (id),
+    path TEXT NOT NULL,
+    vtable_id INTEGER REFERENCES vtables (id),
+    PRIMARY KEY (class_id, path)
+) WITHOUT ROWID;
+
+CREATE TABLE vtables (
+    id INTEGER PRIMARY KEY,
+    module_id INTEGER NOT NULL REFERENCES modules (id),
+    position INTEGER,
+    m_flag INTEGER NOT NULL,
+    v_flag INTEGER NOT NULL,
+    a_flag INTEGER NOT NULL,
+    address INTEGER NOT NULL,
+    relative_address INTEGER NOT NULL,
+    owner TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    class_identifier TEXT NOT NULL,
+    vtable_count INTEGER NOT NULL
+);
+
+CREATE TABLE entries (
+    vtable_id INTEGER NOT NULL REFERENCES vtables (id),
+    position INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    address INTEGER NOT NULL,
+    relative_address INTEGER NOT NULL,
+    function TEXT NOT NULL,
+    definer_id INTEGER REFERENCES classes (id),
+    implementer_id INTEGER REFERENCES classes (id),
+    PRIMARY KEY (vtable_id, position)
+) WITHOUT ROWID;
+
+CREATE INDEX classes_identifier ON classes (identifier);
+CREATE INDEX classes_module ON classes (module_id);
+CREATE INDEX vtables_class_identifier ON vtables (class_identifier);
+CREATE INDEX vtables_address ON vtables (address);
+CREATE INDEX entries_address ON entries (address);
+CREATE INDEX entries_function ON entries (function);
+CREATE INDEX entries_definer ON entries (definer_id, slot);
+"""
+
+type _ClassRow = tuple[int, int, str, int, int, bool, bool, int | None]
+type _VTableRow = tuple[int, int, int | None, bool, bool, bool, int, int, str, str, str, int]
+
+
+def get_store_path(game_dir: Path) -> Path:
+    return game_dir / STORE_NAME
+
+
+class _Rows:
+    """
+    The rows of a hierarchy, with ids given to its classes and vtables as
+    they are found.
+    """
+
+    def __init__(self) -> None:
+        self.modules: list[tuple[int, str]] = []
+        self.classes: list[_ClassRow] = []
+        self.statements: list[tuple[int, int, int]] = []
+        self.bases: list[tuple[int, int, int, int]] = []
+        self.vtable_bindings: list[tuple[int, str, int | None]] = []
+        self.vtables: list[_VTableRow] = []
+        self.entries: list[tuple[int, int, int, int, int, str, int | None, int | None]] = []
+        self._class_ids: dict[Class, int] = {}
+        self._vtable_ids: dict[int, int] = {}
+
+    def add_module(self, linked_module: LinkedModuleBlock) -> None:
+        module_id = len(self.modules) + 1
+        self.modules.append((module_id, linked_module.module))
+        for position, vtable in enumerate(linked_module.vtables):
+            _ = self._get_vtable_id(vtable, module_id, position)
+        for position, cls in enumerate(linked_module.classes):
+            self.statements.append((module_id, position, self._get_class_id(cls, module_id)))
+
+    def _get_class_id(self, cls: Class, module_id: int) -> int:
+        if cls in self._class_ids:
+            return self._class_ids[cls]
+        class_id = self._add_class(cls, module_id)
+
+        # bases are shared, so they are added on an explicit stack of classes
+        # that have ids but no bases yet
+        stack = [cls]
+        while stack:
+            derived = stack.pop()
+            derived_id = self._class_ids[derived]
+            for position, base in enumerate(derived.bases):
+                if base not in self._class_ids:
+                    _ = self._add_class(base, module_id)
+                    stack.append(base)
+                self.bases.append((derived_id, position, self._class_ids[base], base.offset))
+
+            for path, vtable in derived.vtable_bindings.items():
+                path_ids = ",".join(
+                    str(self._get_class_id(base, module_id)) for base in path
+                )
+                vtable_id = self._get_vtable_id(vtable, module_id) if vtable else None
+                self.vtable_bindings.append((derived_id, path_ids, vtable_id))
+        return class_id
+
+    def _add_class(self, cls: Class, module_id: int) -> int:
+        class_id = self._class_ids[cls] = len(self._class_ids) + 1
+        vtable_id = self._get_vtable_id(cls.vtable, module_id) if cls.vtable else None
+        self.classes.append(
+            (
+                class_id,
+                module_id,
+                cls.identifier,
+                cls.offset,
+                cls.get_size(),
+                cls.is_determined_size(),
+                cls.is_faulty,
+                vtable_id,
+            )
+        )
+        return class_id
+
+    def _get_vtable_id(self, vtable: VTable, module_id: int, position: int | None = None) -> int:
+        # vtables are compared by value, so they are told apart by identity
+        if id(vtable) in self._vtable_ids:
+            return self._vtable_ids[id(vtable)]
+        vtable_id = self._vtable_ids[id(vtable)] = len(self._vtable_ids) + 1
+        self.vtables.append(
+            (
+                vtable_id,
+                module_id,
+                position,
+                vtable.m_flag,
+                vtable.v_flag,
+                vtable.a_flag,
+                vtable.address,
+                vtable.relative_address,
+                vtable.owner,
+                vtable.identifier,
+                vtable.class_identifier,
+                vtable.vtable_count,
+            )
+        )
+        for position, entry in enumerate(vtable.vtable_entry_list):
+            function = entry.function
+            self.entries.append(
+                (
+                    vtable_id,
+                    position,
+                    entry.index,
+                    entry.address,
+                    entry.relative_address,
+                    function.identifier,
+                    self._get_class_id(function.definer, module_id) if function.definer else None,
+                    self._get_class_id(function.implementer, module_id)
+                    if function.implementer
+                    else None,
+                )
+            )
+        return vtable_id
+
+
+class HierarchyStore:
+    """
+    The resolved hierarchy of a game in an SQLite file, so that queries are
+    answered without parsing the dumps again. The tables can be queried
+    directly as well, for example for the classes overriding slot 12 of X:
+
+        SELECT DISTINCT implementer.identifier FROM entries
+        JOIN classes AS definer ON definer.id = entries.definer_id
+        JOIN classes AS implementer ON implementer.id = entries.implementer_id
+        WHERE definer.identifier = 'X' AND entries.slot = 12
+            AND implementer.identifier != 'X'
+
+    The store records the `source` it was written from, so that it can be
+    written again once the dumps change.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def get_source(self) -> str | None:
+        """
+        Return the source the store was written from, or None if there is no
+        usable store.
+        """
+        if not self.path.is_file():
+            return None
+        try:
+            connection = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                rows = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            return None
+        if rows.get("schema_version") != str(SCHEMA_VERSION):
+            return None
+        return rows.get("source")
+
+    def write(self, hierarchy: Hierarchy, source: str) -> None:
+        """
+        Replace the store with the modules of `hierarchy`. The store is
+        written to a temporary file first, so readers never see it half
+        written.
+        """
+        rows = _Rows()
+        for linked_module in hierarchy.linked_modules:
+            rows.add_module(linked_module)
+
+        temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temporary.unlink(missing_ok=True)
+        connection = sqlite3.connect(temporary)
+        try:
+            _ = connection.execute("PRAGMA journal_mode = OFF")
+            _ = connection.execute("PRAGMA synchronous = OFF")
+            _ = connection.executescript(_SCHEMA)
+            with connection:
+                _ = connection.executemany(
+                    "INSERT INTO meta VALUES (?, ?)",
+                    [("schema_version", str(SCHEMA_VERSION)), ("source", source)],
+                )
+                _ = connection.executemany("INSERT INTO modules VALUES (?, ?)", rows.modules)
+                _ = connection.executemany(
+                    "INSERT INTO classes VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows.classes
+                )
+                _ = connection.executemany(
+                    "INSERT INTO statements VALUES (?, ?, ?)", rows.statements
+                )
+                _ = connection.executemany("INSERT INTO bases VALUES (?, ?, ?, ?)", rows.bases)
+                _ = connection.executemany(
+                    "INSERT INTO vtable_bindings VALUES (?, ?, ?)", rows.vtable_bindings
+                )
+                _ = connection.executemany(
+                    "INSERT INTO vtables VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows.vtables,
+                )
+                _ = connection.executemany(
+                    "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows.entries
+                )
+        except BaseException:
+            connection.close()
+            temporary.unlink(missing_ok=True)
+            raise
+        connection.close()
+        _ = temporary.replace(self.path)
+
+    def load(self, module: str = "", identifier: str = "") -> Hierarchy:
+        """
+        Load the modules of the store, or only `module` if given. With
+        `identifier`, only the class statements of that name are loaded,
+        along with what they refer to.
+        """
+        connection = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            return _Loader(connection).load(module, identifier)
+        finally:
+            connection.close()
+
+
+class _Loader:
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self._connection = connection
+        self._classes: dict[int, Class] = {}
+        self._vtables: dict[int, VTable] = {}
+        self._sizes: dict[tuple[int, bool], Size] = {}
+
+    def load(self, module: str, identifier: str) -> Hierarchy:
+        execute = self._connection.execute
+        if module:
+            modules: list[tuple[int, str]] = execute(
+                "SELECT id, name FROM modules WHERE name = ?", (module,)
+            ).fetchall()
+            if not modules:
+                print(f"{module} does not exist", file=sys.stderr)
+        else:
+            modules = execute("SELECT id, name FROM modules ORDER BY id").fetchall()
+
+        _ = execute("CREATE TEMP TABLE selected (id INTEGER PRIMARY KEY)")
+        self._fill("selected_modules", [module_id for module_id, _ in modules])
+        if identifier:
+            # the statements of that name and every base they reach
+            _ = execute(
+                """
+                INSERT INTO selected
+                WITH RECURSIVE reachable (id) AS (
+                    SELECT statements.class_id FROM statements
+                    JOIN selected_modules ON selected_modules.id = statements.module_id
+                    JOIN classes ON classes.id = statements.class_id
+                    WHERE classes.identifier = ?
+                    UNION
+                    SELECT bases.base_id FROM bases
+                    JOIN reachable ON reachable.id = bases.class_id
+                )
+                SELECT id FROM reachable
+                """,
+                (identifier,),
+            )
+        else:
+            _ = execute(
+                """
+                INSERT INTO selected
+                SELECT classes.id FROM classes
+                JOIN selected_modules ON selected_modules.id = classes.module_id
+                """
+            )
+            # vtables of the modules that no class refers to
+            self._load_vtables(
+                execute(
+                    """
+                    SELECT vtables.* FROM vtables
+                    JOIN selected_modules ON selected_modules.id = vtables.module_id
+                    """
+                )
+            )
+
+        self._load_classes(
+            execute("SELECT classes.* FROM classes JOIN selected USING (id)").fetchall()
+        )
+        for class_id, position, base_id, _ in execute(
+            "SELECT bases.* FROM bases JOIN selected ON selected.id = bases.class_id "
+            + "ORDER BY bases.class_id, bases.position"
+        ):
+            self._classes[class_id].bases.append(self._classes[base_id])
+
+        bindings: list[tuple[int, str, int | None]] = execute(
+            "SELECT vtable_bindings.* FROM vtable_bindings "
+            + "JOIN selected ON selected.id = vtable_bindings.class_id"
+        ).fetchall()
+        self._load_vtables_by_id(
+            {vtable_id for _, _, vtable_id in bindings if vtable_id is not None}
+        )
+        for class_id, path, vtable_id in bindings:
+            path_classes = tuple(self._classes[int(base_id)] for base_id in path.split(","))
+            vtable = self._vtables[vtable_id] if vtable_id is not None else None
+            self._classes[class_id].vtable_bindings[path_classes] = vtable
+
+        self._load_entries()
+
+        linked_modules: list[LinkedModuleBlock] = []
+        for module_id, name in modules:
+            classes = [
+                self._classes[class_id]
+                for (class_id,) in execute(
+                    "SELECT statements.class_id FROM statements "
+                    + "JOIN selected ON selected.id = statements.class_id "
+                    + "WHERE statements.module_id = ? ORDER BY statements.position",
+                    (module_id,),
+                )
+            ]
+            vtables = [
+                self._vtables[vtable_id]
+                for (vtable_id,) in execute(
+                    "SELECT id FROM vtables WHERE module_id = ? AND position IS NOT NULL "
+                    + "ORDER BY position",
+                    (module_id,),
+                )
+                if vtable_id in self._vtables
+            ]
+            linked_modules.append(
+                LinkedModuleBlock(
+                    name,
+                    classes,
+                    vtables,
+                    {cls.identifier: cls for cls in classes},
+                    {vtable.class_identifier: vtable for vtable in vtables if not vtable.owner},
+                    {
+                        (vtable.owner, vtable.class_identifier): vtable
+                        for vtable in vtables
+                        if vtable.owner
+                    },
+                )
+            )
+        return Hierarchy(linked_modules)
+
+    def _load_classes(self, rows: Iterable[_ClassRow]) -> None:
+        vtable_ids: dict[int, int] = {}
+        for (
+            class_id,
+            _,
+            identifier,
+            offset,
+            size,
+            is_determined_size,
+            is_faulty,
+            vtable_id,
+        ) in rows:
+            cls = Class(identifier, [], offset, 0)
+            size_key = (size, bool(is_determined_size))
+            if size_key not in self._sizes:
+                self._sizes[size_key] = Size(*size_key)
+            cls.share_size(self._sizes[size_key])
+            cls.is_faulty = bool(is_faulty)
+            self._classes[class_id] = cls
+            if vtable_id is not None:
+                vtable_ids[class_id] = vtable_id
+
+        self._load_vtables_by_id(set(vtable_ids.values()))
+        for class_id, vtable_id in vtable_ids.items():
+            self._classes[class_id].vtable = self._vtables[vtable_id]
+
+    def _fill(self, table: str, ids: Iterable[int]) -> None:
+        """
+        Fill the temporary table `table` with `ids`, to join queries against.
+        """
+        _ = self._connection.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY)"
+        )
+        _ = self._connection.execute(f"DELETE FROM {table}")
+        _ = self._connection.executemany(
+            f"INSERT INTO {table} VALUES (?)", [(id_,) for id_ in ids]
+        )
+
+    def _load_vtables_by_id(self, vtable_ids: set[int]) -> None:
+        vtable_ids -= self._vtables.keys()
+        if not vtable_ids:
+            return
+        self._fill("selected_vtables", vtable_ids)
+        self._load_vtables(
+            self._connection.execute(
+                "SELECT vtables.* FROM vtables JOIN selected_vtables USING (id)"
+            )
+        )
+
+    def _load_vtables(self, rows: Iterable[_VTableRow]) -> None:
+        for (
+            vtable_id,
+            _,
+            _,
+            m_flag,
+            v_flag,
+            a_flag,
+            address,
+            relative_address,
+            owner,
+            identifier,
+            class_identifier,
+            vtable_count,
+        ) in rows:
+            self._vtables[vtable_id] = VTable(
+                bool(m_flag),
+                bool(v_flag),
+                bool(a_flag),
+                address,
+                relative_address,
+                owner,
+                identifier,
+                vtable_count,
+                [],
+                class_identifier,
+            )
+
+    def _load_entries(self) -> None:
+        execute = self._connection.execute
+        self._fill("selected_vtables", self._vtables)
+        rows: list[tuple[int, int, int, int, int, str, int | None, int | None]] = execute(
+            "SELECT entries.* FROM entries "
+            + "JOIN selected_vtables ON selected_vtables.id = entries.vtable_id "
+            + "ORDER BY entries.vtable_id, entries.position"
+        ).fetchall()
+
+        # definers and implementers outside of the selected classes are only
+        # told apart by identity, so they are loaded without their bases
+        missing = {
+            class_id
+            for *_, definer_id, implementer_id in rows
+            for class_id in (definer_id, implementer_id)
+            if class_id is not None and class_id not in self._classes
+        }
+        if missing:
+            self._fill("missing", missing)
+            self._load_classes(
+                execute("SELECT classes.* FROM classes JOIN missing USING (id)").fetchall()
+            )
+
+        for (
+            vtable_id,
+            _,
+            slot,
+            address,
+            relative_address,
+            function,
+            definer_id,
+            implementer_id,
+        ) in rows:
+            entry = VTableEntry(slot, address, relative_address, function)
+            if definer_id is not None:
+                entry.function.definer = self._classes[definer_id]
+            if implementer_id is not None:
+                entry.function.implementer = self._classes[implementer_id]
+            self._vtables[vtable_id].vtable_entry_list.append(entry)
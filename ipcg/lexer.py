@@ -7,7 +7,7 @@ type LexerBackend = Literal["pygments", "clex"]
 
 
 class LexerProvider(Protocol):
-    def tokenize(self, text: str) -> Iterator[Token]: ...
+    def tokenize(self, text: str, line: int = 1) -> Iterator[Token]: ...
 
 
 def get_lexer_provider(backend: LexerBackend = "pygments") -> LexerProvider:
@@ -0,0 +1,185 @@
+import asyncio
+import bz2
+import gzip
+import lzma
+import re
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+from typing import IO
+
+from .exeptions import StaleIndexException
+from .lexer import LexerProvider
+from .module_index import ModuleIndex
+from .parser import InheritanceParser, VTableParser
+from .statement import Class, ModuleBlock, Statement, VTable
+from .structure_table import StructureTable
+
+CHUNK_SIZE = 1 << 18
+
+_END_MODULE = re.compile(r"^< ?end [^\n]*\n", re.MULTILINE)
+
+type GameModules = tuple[list[ModuleBlock[Class]], list[ModuleBlock[VTable]]]
+
+_OPENERS: dict[str, Callable[[Path, str], IO[str]]] = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+    ".lzma": lzma.open,
+}
+
+try:
+    from compression import zstd  # pyright: ignore[reportMissingImports]
+except ImportError:
+    pass
+else:
+    _OPENERS[".zst"] = zstd.open  # pyright: ignore[reportUnknownMemberType]
+
+
+def find_dump_file(directory: Path, name: str) -> Path:
+    """
+    Return the path of the dump `name` in `directory`, preferring the plain
+    file over its compressed variants. If none exists, the plain path is
+    returned so that the caller can report it as missing.
+    """
+    for suffix in ("", *_OPENERS):
+        path = directory / f"{name}{suffix}"
+        if path.is_file():
+            return path
+    return directory / name
+
+
+def is_compressed(path: Path) -> bool:
+    return path.suffix in _OPENERS
+
+
+def open_dump(path: Path) -> IO[str]:
+    """
+    Open a dump file for reading text, decompressing it on the fly when its
+    suffix names a compression format.
+    """
+    if opener := _OPENERS.get(path.suffix):
+        return opener(path, "rt")
+    return path.open("r")
+
+
+async def iter_module_texts(
+    path: Path, chunk_size: int = CHUNK_SIZE
+) -> AsyncIterator[tuple[str, int]]:
+    """
+    Read `path` in chunks on a worker thread and yield the text of every module
+    block, with the line it starts on, as soon as the block is complete. The
+    blank lines after a block are kept with it, so every block starts a line.
+    """
+    with open_dump(path) as f:
+        buffer = ""
+        line = 1
+        position = 0
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            buffer += chunk
+
+            start = 0
+            while match := _END_MODULE.search(buffer, position):
+                end = match.end()
+                while end < len(buffer) and buffer[end] == "\n":
+                    end += 1
+                if chunk and end == len(buffer):
+                    # more blank lines may follow in the next chunk
+                    position = match.start()
+                    break
+                block = buffer[start:end]
+                yield block, line
+                line += block.count("\n")
+                start = position = end
+            else:
+                position = max(position, buffer.rfind("\n") + 1)
+
+            buffer = buffer[start:]
+            position -= start
+
+            if not chunk:
+                if buffer.strip():
+                    yield buffer, line
+                return
+
+
+async def parse_modules[T: Statement](
+    path: Path, parse: Callable[[str, int], list[ModuleBlock[T]]]
+) -> list[ModuleBlock[T]]:
+    """
+    Parse the module blocks of `path` one by one while the rest of the file
+    is still being read.
+    """
+    modules: list[ModuleBlock[T]] = []
+    async for text, line in iter_module_texts(path):
+        modules.extend(parse(text, line))
+    return modules
+
+
+async def parse_module[T: Statement](
+    path: Path, module: str, parse: Callable[[str, int], list[ModuleBlock[T]]]
+) -> list[ModuleBlock[T]]:
+    """
+    Parse only the block of `module` in `path`. Plain dumps are read from the
+    byte range recorded in their module index, compressed ones are streamed.
+    """
+    if is_compressed(path):
+        modules = await parse_modules(path, parse)
+        return [module_block for module_block in modules if module_block.module == module]
+
+    if (block := await asyncio.to_thread(_read_indexed_module, path, module)) is None:
+        return []
+    text, line = block
+    return parse(text, line)
+
+
+def _read_indexed_module(path: Path, module: str) -> tuple[str, int] | None:
+    """
+    Return the block of `module` in `path` and its starting line, read
+    through the module index of `path`, or None if there is no such block.
+    """
+    index = ModuleIndex.load(path)
+    try:
+        return _read_module_range(index, module)
+    except StaleIndexException:
+        # the dump changed in place, keeping its size and modification time
+        return _read_module_range(ModuleIndex.rebuild(path), module)
+
+
+def _read_module_range(index: ModuleIndex, module: str) -> tuple[str, int] | None:
+    if (module_range := index.modules.get(module)) is None:
+        return None
+    return index.read(module_range), module_range.line
+
+
+async def load_game(
+    inheritance: Path,
+    vtable: Path,
+    lexer: LexerProvider,
+    module: str = "",
+    structures: StructureTable | None = None,
+) -> GameModules:
+    """
+    Load and parse the inheritance and vtable dumps of a game concurrently,
+    or only the blocks of `module` if given. Identical parsed bases are
+    shared through `structures`, or a table of the game's own.
+    """
+    if structures is None:
+        structures = StructureTable()
+
+    def parse_inheritance(text: str, line: int) -> list[ModuleBlock[Class]]:
+        return InheritanceParser(lexer.tokenize(text, line), structures).parse()
+
+    def parse_vtable(text: str, line: int) -> list[ModuleBlock[VTable]]:
+        return VTableParser(lexer.tokenize(text, line)).parse()
+
+    if module:
+        return await asyncio.gather(
+            parse_module(inheritance, module, parse_inheritance),
+            parse_module(vtable, module, parse_vtable),
+        )
+    return await asyncio.gather(
+        parse_modules(inheritance, parse_inheritance),
+        parse_modules(vtable, parse_vtable),
+    )
+
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from .exeptions import StaleIndexException
+
+INDEX_SUFFIX = ".ipcg-index"
+INDEX_VERSION = 2
+
+_BEGIN_MODULE = re.compile(rb"<([\w-]+(?:\.[\w-]+)+)>")
+_END_MODULE = re.compile(rb"< ?end ")
+
+
+@dataclass(frozen=True, slots=True)
+class ModuleRange:
+    module: str
+    start: int
+    end: int
+    line: int
+    digest: str
+
+
+@dataclass(frozen=True, slots=True)
+class ModuleIndex:
+    """
+    Byte range, starting line and digest of every module block in a dump
+    file, stored next to it in a sidecar file that is rebuilt when the dump
+    changes. Loading only compares the size and modification time of the
+    dump, and the digest of a block is checked when the block is read.
+    """
+
+    path: Path
+    size: int
+    mtime_ns: int
+    digest: str
+    modules: dict[str, ModuleRange]
+
+    @classmethod
+    def load(cls, path: Path) -> ModuleIndex:
+        stat = path.stat()
+        sidecar = path.with_name(path.name + INDEX_SUFFIX)
+        try:
+            with sidecar.open("r") as f:
+                data = json.load(f)
+            if (
+                data["version"] == INDEX_VERSION
+                and data["size"] == stat.st_size
+                and data["mtime_ns"] == stat.st_mtime_ns
+            ):
+                return cls(
+                    path,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    data["digest"],
+                    {
+                        module: ModuleRange(module, start, end, line, module_digest)
+                        for module, start, end, line, module_digest in data["modules"]
+                    },
+                )
+        except (OSError, ValueError, KeyError):
+            pass
+
+        return cls.rebuild(path)
+
+    @classmethod
+    def rebuild(cls, path: Path) -> ModuleIndex:
+        index = cls.build(path)
+        index.save(path.with_name(path.name + INDEX_SUFFIX))
+        return index
+
+    @classmethod
+    def build(cls, path: Path) -> ModuleIndex:
+        stat = path.stat()
+        digest = hashlib.blake2b()
+        module_digest = hashlib.blake2b()
+        modules: dict[str, ModuleRange] = {}
+
+        module: str | None = None
+        start = 0
+        start_line = 0
+        offset = 0
+        with path.open("rb") as f:
+            for line_nr, line in enumerate(f, start=1):
+                digest.update(line)
+                if line.startswith(b"<"):
+                    if match := _BEGIN_MODULE.match(line):
+                        module = match.group(1).decode()
+                        module_digest = hashlib.blake2b()
+                        start = offset
+                        start_line = line_nr
+                    elif module is not None and _END_MODULE.match(line):
+                        module_digest.update(line)
+                        end = offset + len(line)
+                        modules[module] = ModuleRange(
+                            module, start, end, start_line, module_digest.hexdigest()
+                        )
+                        module = None
+                if module is not None:
+                    module_digest.update(line)
+                offset += len(line)
+
+        return cls(path, stat.st_size, stat.st_mtime_ns, digest.hexdigest(), modules)
+
+    def save(self, sidecar: Path) -> None:
+        data = {
+            "version": INDEX_VERSION,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "digest": self.digest,
+            "modules": [
+                [
+                    module_range.module,
+                    module_range.start,
+                    module_range.end,
+                    module_range.line,
+                    module_range.digest,
+                ]
+                for module_range in self.modules.values()
+            ],
+        }
+        try:
+            with sidecar.open("w") as f:
+                json.dump(data, f)
+        except OSError:
+            # a read-only dump share only costs us the rebuild on the next run
+            pass
+
+    def read(self, module_range: ModuleRange) -> str:
+        """
+        Read the block of `module_range`. Raises StaleIndexException if the
+        block no longer matches its digest, as when the dump was changed
+        without changing its size or modification time.
+        """
+        with self.path.open("rb") as f:
+            _ = f.seek(module_range.start)
+            data = f.read(module_range.end - module_range.start)
+        if hashlib.blake2b(data).hexdigest() != module_range.digest:
+            raise StaleIndexException(f"{self.path} changed since it was indexed")
+        # decode like open() does, including newline translation
+        return io.TextIOWrapper(io.BytesIO(data)).read()
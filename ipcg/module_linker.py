@@ -1,15 +1,86 @@
+import sys
+
 from .statement import Class, LinkedModuleBlock, ModuleBlock, VTable
 
 
+class ModuleLinker:
+    """
+    Links class and vtable modules by name. Modules are linked on first
+    request, so a query about one module never touches the others. Of the
+    blocks of a module listed more than once in a dump, the last is linked,
+    as the module index of the dump also keeps, and the others are reported.
+    """
+
+    def __init__(
+        self,
+        class_modules: list[ModuleBlock[Class]],
+        vtable_modules: list[ModuleBlock[VTable]],
+    ) -> None:
+        self._class_modules = self._index(class_modules, "classes")
+        self._vtable_modules = self._index(vtable_modules, "vtables")
+        self._linked_modules: dict[str, LinkedModuleBlock] = {}
+
+    @staticmethod
+    def _index[T: (Class, VTable)](
+        modules: list[ModuleBlock[T]], kind: str
+    ) -> dict[str, ModuleBlock[T]]:
+        indexed: dict[str, ModuleBlock[T]] = {}
+        for module_block in modules:
+            if module_block.module in indexed:
+                print(
+                    f"{module_block.module} has its {kind} listed more than once, "
+                    + "only the last block is linked",
+                    file=sys.stderr,
+                )
+            indexed[module_block.module] = module_block
+        return indexed
+
+    @property
+    def modules(self) -> list[str]:
+        return list(self._class_modules | self._vtable_modules)
+
+    def link(self, module: str) -> LinkedModuleBlock | None:
+        if module in self._linked_modules:
+            return self._linked_modules[module]
+
+        if module not in self._class_modules:
+            if module in self._vtable_modules:
+                print(f"{module} has vtables but no classes", file=sys.stderr)
+            else:
+                print(f"{module} does not exist", file=sys.stderr)
+            return None
+
+        class_module = self._class_modules[module]
+        vtable_module = self._vtable_modules.get(module)
+        if vtable_module is None:
+            print(f"{module} has classes but no vtables", file=sys.stderr)
+            vtable_module = ModuleBlock[VTable](module, [])
+
+        linked_module = LinkedModuleBlock(
+            module,
+            class_module.statements,
+            vtable_module.statements,
+            class_module.symbols,
+            vtable_module.symbols,
+            vtable_module.owned_symbols,
+        )
+        self._linked_modules[module] = linked_module
+        return linked_module
+
+
 def link_modules(
-    class_modules: list[ModuleBlock[Class]], vtable_modules: list[ModuleBlock[VTable]]
+    class_modules: list[ModuleBlock[Class]],
+    vtable_modules: list[ModuleBlock[VTable]],
+    module: str = "",
 ) -> list[LinkedModuleBlock]:
+    """
+    Link the modules of both dumps by name, or only `module` if given. Modules
+    missing from either dump are reported and left out or linked without
+    vtables.
+    """
+    linker = ModuleLinker(class_modules, vtable_modules)
     linked_modules: list[LinkedModuleBlock] = []
-    for class_module, vtable_module in zip(class_modules, vtable_modules):
-        if class_module.module != vtable_module.module:
-            raise Exception("Different modules tried to be linked.")
-        classes: list[Class] = class_module.statements
-        vtables: list[VTable] = vtable_module.statements
-        linked_modules.append(LinkedModuleBlock(class_module.module, classes, vtables))
-
+    for name in [module] if module else linker.modules:
+        if linked_module := linker.link(name):
+            linked_modules.append(linked_module)
     return linked_modules
@@ -1,22 +1,37 @@
+import multiprocessing
+import pickle
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 
-from .statement import Class, LinkedModuleBlock, Statement
+from .hierarchy import ClassView, Hierarchy
+from .statement import Class
 
+# a class to print, as the indices of its module and class statement and the
+# indices of the bases leading from the class statement to it
+type _ClassLocation = tuple[int, int, tuple[int, ...]]
 
-class Printer(Statement.Visitor):
-    def __init__(self, module: Optional[str] = None, identifier: Optional[str] = None):
-        self._established_classes: set[str] = set()
+
+class Printer:
+    def __init__(
+        self,
+        module: Optional[str] = None,
+        identifier: Optional[str] = None,
+        jobs: int = 1,
+    ):
         self.module = module
         self.identifier = identifier
+        self.jobs = jobs
         self.fixed_names = {}
 
-    def print(self, statements: list[LinkedModuleBlock]) -> None:
-        for statement in statements:
-            if self.module:
-                if statement.module != self.module:
-                    continue
-            self.execute(statement)
+    def print(self, hierarchy: Hierarchy) -> None:
+        if self.jobs > 1:
+            self._print_parallel(hierarchy)
+            return
+
+        for view in hierarchy.iter_class_definitions(self.module, self.identifier):
+            print(self._format_class(view))
 
         # print('int main() {')
         # for statement in statements:
@@ -27,29 +42,45 @@ class Printer(Statement.Visitor):
         #         print(f'\tassert(sizeof({self._fix_identifier(cls.identifier)})==0x{cls.get_size():X});')
         # print('}')
 
-    def execute(self, statement: Statement) -> None:
-        statement.accept(self)
-
-    def execute_block(self, statements: list[Class]):
-        for statement in statements:
-            if self.identifier:
-                if statement.identifier != self.identifier:
-                    continue
-            self.execute(statement)
-
-    def visit_linked_module_block(self, statement: LinkedModuleBlock) -> None:
-        self.execute_block(statement.classes)
-
-    def visit_class(self, cls: Class) -> None:
-        if cls.identifier in self._established_classes:
-            return
-
-        for base in cls.bases:
-            self.visit_class(base)
-
-        print(self._format_class(cls))
-
-        self._established_classes.add(cls.identifier)
+    def _print_parallel(self, hierarchy: Hierarchy) -> None:
+        """
+        Print like `print`, but format the classes on `jobs` worker
+        processes. The order of the classes is settled up front, and the
+        formatted classes are written in that order. Forked workers share the
+        resolved classes, other workers are sent them pickled.
+        """
+        statement_indices = {
+            id(cls): (module_index, class_index)
+            for module_index, linked_module in enumerate(hierarchy.linked_modules)
+            for class_index, cls in enumerate(linked_module.classes)
+        }
+        locations: list[_ClassLocation] = []
+        for view in hierarchy.iter_class_definitions(self.module, self.identifier):
+            base_indices: list[int] = []
+            derived = view.statement
+            for base in view.path:
+                base_indices.append(derived.bases.index(base))
+                derived = base
+            locations.append((*statement_indices[id(view.statement)], tuple(base_indices)))
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+            shared: Hierarchy | bytes = hierarchy
+        else:
+            context = multiprocessing.get_context("spawn")
+            # pickled once, instead of once per worker
+            shared = pickle.dumps(hierarchy, protocol=pickle.HIGHEST_PROTOCOL)
+
+        chunksize = max(1, len(locations) // (self.jobs * 4))
+        with ProcessPoolExecutor(
+            max_workers=self.jobs,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(shared,),
+        ) as executor:
+            for formatted in executor.map(_format_class, locations, chunksize=chunksize):
+                _ = sys.stdout.write(formatted)
+                _ = sys.stdout.write("\n")
 
     def _fix_identifier(self, identifier: str) -> str:
         if identifier in self.fixed_names:
@@ -61,7 +92,11 @@ class Printer(Statement.Visitor):
         self.fixed_names[identifier] = new_identifier
         return new_identifier
 
-    def _format_class(self, cls: Class) -> str:
+    def _format_class(self, view: ClassView) -> str:
+        top_cls = view.statement
+        path = view.path
+        cls = view.cls
+        vtable = view.vtable
         formatted = f"// Is determined size: {cls.is_determined_size()}\n"
         formatted += f"// Size: {cls.get_size():X}\n"
         formatted += f"class {self._fix_identifier(cls.identifier)}"
@@ -73,19 +108,8 @@ class Printer(Statement.Visitor):
                 formatted += f", {self._fix_identifier(base.identifier)}"
         formatted += " {\n"
         # formatted += "public:\n"
-        if cls.vtable:
-            for virtual_method in cls.vtable.vtable_entry_list:
-                virtual_function = virtual_method.function
-
-                if (
-                    virtual_function.implementer
-                    and virtual_function.definer
-                    and (
-                        virtual_function.implementer.identifier == cls.identifier
-                        or virtual_function.definer.identifier == cls.identifier
-                    )
-                ):
-                    formatted += f"\tvirtual void {self._fix_identifier(virtual_method.function.identifier)}(){{}}\n"
+        for virtual_method in view.iter_virtual_methods():
+            formatted += f"\tvirtual void {self._fix_identifier(virtual_method.function.identifier)}(){{}}\n"
 
         if cls.get_size() == 0 and not cls.bases:
             padded_offset = f"{cls.offset:X}"
@@ -94,8 +118,10 @@ class Printer(Statement.Visitor):
         elif cls.is_determined_size() and (size := cls.get_size()) > 8:
             # highest base with a determined size
             selected_base: Class = cls
+            selected_path = path
             while len(selected_base.bases) > 0:
                 selected_base = selected_base.bases[-1]
+                selected_path += (selected_base,)
                 if selected_base.is_determined_size():
                     break
 
@@ -110,14 +136,14 @@ class Printer(Statement.Visitor):
                 )
                 size -= selected_base.offset + selected_base_size
                 if (
-                    not selected_base.vtable
+                    not top_cls.get_base_vtable(selected_path)
                     and selected_base.offset == 0
-                    and cls.vtable
+                    and vtable
                 ):
                     size -= 8
                 padded_offset = f"{cls.get_size() - size:X}"
             else:
-                if cls.vtable:
+                if vtable:
                     size -= 8
                 padded_offset = f"{cls.offset:X}"
 
@@ -129,3 +155,27 @@ class Printer(Statement.Visitor):
         formatted += "};\n"
 
         return formatted
+
+
+_worker_printer = Printer()
+_worker_hierarchy = Hierarchy([])
+
+
+def _init_worker(hierarchy: Hierarchy | bytes) -> None:
+    global _worker_hierarchy
+    if isinstance(hierarchy, bytes):
+        hierarchy = pickle.loads(hierarchy)
+    _worker_hierarchy = hierarchy
+
+
+def _format_class(location: _ClassLocation) -> str:
+    module_index, class_index, base_indices = location
+    linked_module = _worker_hierarchy.linked_modules[module_index]
+    cls = linked_module.classes[class_index]
+    path: list[Class] = []
+    base = cls
+    for index in base_indices:
+        base = base.bases[index]
+        path.append(base)
+    view = ClassView(linked_module.module, cls, tuple(path))
+    return _worker_printer._format_class(view)  # pyright: ignore[reportPrivateUsage]
@@ -7,12 +7,20 @@ from typing import NoReturn
 from ipcg.tokens import Token, TokenKind
 
 from .exeptions import ParseException
-from .statement import Class, ModuleBlock, VTable, VTableEntry
+from .statement import Class, ModuleBlock, VTable, VTableEntryFields
+from .structure_table import StructureTable
+
+_VFTABLE_SUFFIX = "::`vftable'"
+_ANONYMOUS_VFTABLE_SUFFIX = "::`anonymous namespace'::`vftable'"
 
 
 class InheritanceParser:
-    def __init__(self, token_stream: Iterator[Token]) -> None:
+    def __init__(
+        self, token_stream: Iterator[Token], structures: StructureTable | None = None
+    ) -> None:
         self._token_stream: Iterator[Token] = token_stream
+        # shares the bases of identical structure between class statements
+        self._structures = structures
 
         self._current: Token = Token(TokenKind.EOF, "", 0)
         self._previous: Token = Token(TokenKind.EOF, "", 0)
@@ -21,7 +29,6 @@ class InheritanceParser:
         self._previous = self._current
         try:
             self._current = next(self._token_stream)
-            print(self._current)
         except StopIteration:
             self._current = Token(TokenKind.EOF, "EOF", 0)
 
@@ -37,6 +44,13 @@ class InheritanceParser:
             return
         raise self._error(message)
 
+    def _consume_value(self, token_kind: TokenKind, message: str) -> int:
+        value = self._current.value
+        if self._current.kind is not token_kind or value is None:
+            raise self._error(message)
+        self._advance()
+        return value
+
     def _check(self, token_kind: TokenKind) -> bool:
         return self._current.kind is token_kind
 
@@ -66,8 +80,11 @@ class InheritanceParser:
         module_begin_literal = self._begin_module().literal
 
         class_statements: list[Class] = []
+        symbols: dict[str, Class] = {}
         while self._check(TokenKind.IDENTIFIER):
-            class_statements.append(self._class_statement())
+            class_statement = self._class_statement()
+            class_statements.append(class_statement)
+            symbols[class_statement.identifier] = class_statement
             _ = self._match(
                 TokenKind.EMPTY_LINE,
                 # "Different type declarations need to be separated by a newline.",
@@ -75,7 +92,7 @@ class InheritanceParser:
         module_end_literal = self._end_module().literal
         if module_begin_literal != module_end_literal:
             raise ParseException("Module name did not match declared module name.")
-        return ModuleBlock(module_begin_literal, class_statements)
+        return ModuleBlock(module_begin_literal, class_statements, symbols)
 
     def _begin_module(self) -> Token:
         """
@@ -117,7 +134,10 @@ class InheritanceParser:
                     current_class = class_statement
 
         # if class has vtable, then class size is at least 8 bytes
-        return Class(token.literal, base_classes, 0, 0)
+        statement = Class(token.literal, base_classes, 0, 0)
+        if self._structures:
+            self._structures.intern_bases(statement)
+        return statement
 
     def _class_inheritance_list(self) -> list[Class]:
         """
@@ -136,10 +156,9 @@ class InheritanceParser:
         """
         class_inheritance : hexadecimal identifier
         """
-        offset = self._consume(TokenKind.HEX, "Expect hexadecimal offset.")
+        offset = self._consume_value(TokenKind.HEX, "Expect hexadecimal offset.")
         class_name = self._consume(TokenKind.IDENTIFIER, "Expect identifier.")
-        offset_number = int(offset.literal, 16)
-        return Class(class_name.literal, [], offset_number, 0)
+        return Class(class_name.literal, [], offset, 0)
 
     def parse(self) -> list[ModuleBlock[Class]]:
         statements: list[ModuleBlock[Class]] = []
@@ -177,6 +196,13 @@ class VTableParser:
             return
         raise self._error(message)
 
+    def _consume_value(self, token_kind: TokenKind, message: str) -> int:
+        value = self._current.value
+        if self._current.kind is not token_kind or value is None:
+            raise self._error(message)
+        self._advance()
+        return value
+
     def _check(self, token_kind: TokenKind) -> bool:
         return self._current.kind is token_kind
 
@@ -205,8 +231,15 @@ class VTableParser:
         """
         module_begin_literal = self._begin_module().literal
         vtable_lists: list[VTable] = []
+        symbols: dict[str, VTable] = {}
+        owned_symbols: dict[tuple[str, str], VTable] = {}
         while self._check(TokenKind.M_FLAG):
-            vtable_lists.append(self._vtable_declaration())
+            vtable = self._vtable_declaration()
+            vtable_lists.append(vtable)
+            if vtable.owner:
+                owned_symbols[(vtable.owner, vtable.class_identifier)] = vtable
+            else:
+                symbols[vtable.class_identifier] = vtable
             _ = self._match(
                 TokenKind.EMPTY_LINE,
                 # "Expect empty line after vtable.",
@@ -215,7 +248,7 @@ class VTableParser:
         if module_begin_literal != module_end_literal:
             raise ParseException("Module name did not match declared module name.")
         _ = self._match(TokenKind.EMPTY_LINE)
-        return ModuleBlock(module_begin_literal, vtable_lists)
+        return ModuleBlock(module_begin_literal, vtable_lists, symbols, owned_symbols)
 
     def _begin_module(self) -> Token:
         """
@@ -244,12 +277,10 @@ class VTableParser:
         m_flag = self._consume(TokenKind.M_FLAG, "Expect m flag.").literal
         v_flag = self._consume(TokenKind.V_FLAG, "Expect v flag.").literal
         a_flag = self._consume(TokenKind.A_FLAG, "Expect a flag.").literal
-        address = self._consume(
-            TokenKind.HEX, "Expect address as a hex number."
-        ).literal
-        relative_address = self._consume(
+        address = self._consume_value(TokenKind.HEX, "Expect address as a hex number.")
+        relative_address = self._consume_value(
             TokenKind.HEX, "Expect relative address as a hex number."
-        ).literal
+        )
         owner = ""
 
         if not self._check_literal("const"):
@@ -260,58 +291,59 @@ class VTableParser:
 
         self._consume_literal("Virtual Functions", "Expect 'Virtual Functions'.")
         self._consume_literal("(", "Expect '('.")
-        vtable_count = self._consume(TokenKind.NUMBER, "Expect decimal number.").literal
+        vtable_count = self._consume_value(TokenKind.NUMBER, "Expect decimal number.")
         self._consume_literal(")", "Expect ')'.")
         self._consume_literal(":", "Expect ':'.")
 
-        address_number = int(address, base=16)
-        relative_address_number = int(relative_address, base=16)
-        vtable_count_number = int(vtable_count)
+        vtable_entry_list = self._vtable_entry_list(vtable_count)
 
-        vtable_entry_list = self._vtable_entry_list(vtable_count_number)
+        identifier = identifier.strip()
+        if identifier.endswith(_ANONYMOUS_VFTABLE_SUFFIX):
+            class_identifier = identifier[: -len(_ANONYMOUS_VFTABLE_SUFFIX)]
+        else:
+            class_identifier = identifier[: -len(_VFTABLE_SUFFIX)]
 
         return VTable(
             m_flag != " ",
             v_flag != " ",
             a_flag != " ",
-            address_number,
-            relative_address_number,
+            address,
+            relative_address,
             owner,
-            identifier.strip(),
-            vtable_count_number,
+            identifier,
+            vtable_count,
             vtable_entry_list,
+            class_identifier,
         )
 
-    def _vtable_entry_list(self, count: int) -> list[VTableEntry]:
+    def _vtable_entry_list(self, count: int) -> VTableEntryFields:
         """
         vtable_entry_list : vtable_entry+
         """
-        entries: list[VTableEntry] = []
+        # most vtables are never looked into, so only the fields of the
+        # entries are kept until they are
+        entries = VTableEntryFields()
         for _ in range(count):
-            entries.append(self._vtable_entry())
+            self._vtable_entry(entries)
 
         return entries
 
-    def _vtable_entry(self) -> VTableEntry:
+    def _vtable_entry(self, entries: VTableEntryFields) -> None:
         """
         vtable_entry : number address relative_address function_type function_address
         """
-        index = self._consume(TokenKind.NUMBER, "Expect entry index.").literal
-        address = self._consume(TokenKind.HEX, "Expect address.").literal
-        relative_address = self._consume(
-            TokenKind.HEX, "Expect relative address."
-        ).literal
+        index = self._consume_value(TokenKind.NUMBER, "Expect entry index.")
+        address = self._consume_value(TokenKind.HEX, "Expect address.")
+        relative_address = self._consume_value(TokenKind.HEX, "Expect relative address.")
         function_identifier = self._consume(
             TokenKind.IDENTIFIER, "Expect function identifier."
         ).literal
 
-        index_number = int(index)
-        address_number = int(address, base=16)
-        relative_address_number = int(relative_address, base=16)
-
-        return VTableEntry(
-            index_number, address_number, relative_address_number, function_identifier
-        )
+        try:
+            entries.numbers.extend((index, address, relative_address))
+        except OverflowError:
+            raise self._error("Expect a 64-bit number.")
+        entries.function_identifiers.append(function_identifier)
 
     def parse(self) -> list[ModuleBlock[VTable]]:
         statements: list[ModuleBlock[VTable]] = []
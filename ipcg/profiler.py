@@ -0,0 +1,66 @@
+import cProfile
+import sys
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+_PACKAGE_DIR = Path(__file__).resolve().parent
+_TRACEBACK_LIMIT = 32
+
+
+@contextmanager
+def profile(
+    output: str, *, trace_memory: bool = False, top: int = 10
+) -> Iterator[None]:
+    """
+    Run the wrapped block under cProfile and dump the stats to `output`.
+    With `trace_memory`, also trace allocations and print the `top` ipcg
+    modules by allocated size to stderr.
+    """
+    profiler = cProfile.Profile()
+    if trace_memory:
+        tracemalloc.start(_TRACEBACK_LIMIT)
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot() if trace_memory else None
+        tracemalloc.stop()
+
+        profiler.dump_stats(output)
+        print(f"Profile written to {output}", file=sys.stderr)
+        if snapshot:
+            _print_allocation_summary(snapshot, top)
+
+
+def _module_name(filename: str) -> str | None:
+    path = Path(filename)
+    if path.name == "main.py":
+        return "main"
+    try:
+        relative = path.resolve().relative_to(_PACKAGE_DIR)
+    except ValueError:
+        return None
+    return ".".join(("ipcg", *relative.with_suffix("").parts))
+
+
+def _print_allocation_summary(snapshot: tracemalloc.Snapshot, top: int) -> None:
+    # attribute every allocation to the innermost ipcg frame of its traceback,
+    # so that allocations made in stdlib or pygments code count for the caller
+    totals: dict[str, list[int]] = {}
+    for statistic in snapshot.statistics("traceback"):
+        module = "<other>"
+        for frame in reversed(statistic.traceback):
+            if name := _module_name(frame.filename):
+                module = name
+                break
+        total = totals.setdefault(module, [0, 0])
+        total[0] += statistic.size
+        total[1] += statistic.count
+
+    ranked = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+    print(f"{'module':<32}{'size (KiB)':>14}{'blocks':>12}", file=sys.stderr)
+    for module, (size, count) in ranked[:top]:
+        print(f"{module:<32}{size / 1024:>14.1f}{count:>12}", file=sys.stderr)
@@ -22,12 +22,20 @@ _CLEX_MAP: dict[int, TokenKind] = {
 }
 
 
+# tokens scanned per call, each call scanning without the GIL
+_BATCH_SIZE = 4096
+
+
 class ClexProvider:
-    def tokenize(self, text: str) -> Iterator[Token]:
-        lexer = clex.Lexer(text)
-        while True:
-            tok = lexer.scan_token()
-            if tok.type == clex.TOKEN_EOF:
-                return
-            kind = _CLEX_MAP.get(tok.type, TokenKind.IDENTIFIER)
-            yield Token(kind, tok.literal, tok.line)
+    def __init__(self) -> None:
+        # shared by the lexers of every dump and module read in this run, so
+        # that a class name is one string object wherever it appears
+        self._interned = clex.InternTable()
+
+    def tokenize(self, text: str, line: int = 1) -> Iterator[Token]:
+        lexer = clex.Lexer(text, self._interned)
+        lexer.line = line
+        while tokens := lexer.scan_tokens(_BATCH_SIZE):
+            for tok in tokens:
+                kind = _CLEX_MAP.get(tok.type, TokenKind.IDENTIFIER)
+                yield Token(kind, tok.literal, tok.line, tok.value)
@@ -1,17 +1,13 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, final
+import re
+from bisect import bisect_left
+from collections.abc import Iterator
+from typing import final
 
 from pygments.lexer import RegexLexer, bygroups
 from pygments.token import Keyword, Name, Number, Punctuation, Token, Whitespace
 
-if TYPE_CHECKING:
-    from pygments.token import _TokenType
-
-    TokenType = tuple[_TokenType, str, int]
-
-from collections.abc import Iterator
-
 from ..tokens import Token as TokenStruct
 from ..tokens import TokenKind
 
@@ -39,20 +35,65 @@ _LITERAL_MAP: dict[str, TokenKind] = {
 
 
 class PygmentsProvider:
-    def tokenize(self, text: str) -> Iterator[TokenStruct]:
-        lexer = PygmentsLexer()
-        for pygments_type, literal, line in lexer.tokenize(text):
+    def __init__(self) -> None:
+        # the lexer keeps no state between calls
+        self._lexer = PygmentsLexer()
+
+    def tokenize(self, text: str, line: int = 1) -> Iterator[TokenStruct]:
+        text, end = self._lexer.preprocess(text)
+        # the line of a token is the line it ends on, looked up among the
+        # offsets of the newlines once a token ends past the next newline
+        newlines = [match.start() for match in _NEWLINE.finditer(text, 0, end)]
+        newlines.append(len(text))
+        newline_index = 0
+        line_nr = line
+        last_offset = TokenStruct(TokenKind.HEX, "", 0)
+        offset: int
+        literal: str
+        for offset, pygments_type, literal in self._lexer.get_tokens_unprocessed(text):
+            if offset >= end:
+                break
+            if pygments_type is Whitespace:
+                continue
+            token_end = offset + len(literal)
+            if token_end > newlines[newline_index]:
+                newline_index = bisect_left(newlines, token_end, newline_index)
+                line_nr = line + newline_index
+
+            if pygments_type is Name.NoHexIdentifier:
+                # the class is at the offset of the line before
+                yield TokenStruct(TokenKind.HEX, last_offset.literal, line_nr, last_offset.value)
+                yield TokenStruct(TokenKind.IDENTIFIER, literal, line_nr)
+                continue
+
             kind = _PYGMENTS_MAP.get(pygments_type)
             if kind is None and pygments_type is Punctuation:
                 kind = _LITERAL_MAP.get(literal)
             if kind is None:
                 kind = TokenKind.IDENTIFIER  # fallback
-            yield TokenStruct(kind, literal, line)
+            if kind is TokenKind.HEX:
+                last_offset = TokenStruct(kind, literal, line_nr, _parse_int(literal, 16))
+                yield last_offset
+            elif kind is TokenKind.NUMBER:
+                yield TokenStruct(kind, literal, line_nr, _parse_int(literal, 10))
+            else:
+                yield TokenStruct(kind, literal, line_nr)
+
+
+def _parse_int(literal: str, base: int) -> int | None:
+    try:
+        return int(literal, base)
+    except ValueError:
+        # left to the parser to report
+        return None
 
 
 # --- LEXER ---
 
 
+_NEWLINE = re.compile("\n")
+
+
 # https://www.cs.auckland.ac.nz/references/unix/digital/AQTLTBTE/DOCU_006.HTM
 
 
@@ -113,19 +154,25 @@ class PygmentsLexer(RegexLexer):
         ]
     }
 
-    def tokenize(self, text: str) -> Iterator[TokenType]:
-        token_stream: Iterator[_TokenType] = self.get_tokens(text)
-        line_nr = 1
-        last_offset: str = ""
-        literal: str
-        for token, literal in token_stream:
-            line_nr += literal.count("\n")
-            if token is Whitespace:
-                continue
-            elif token is Number.Hex:
-                last_offset = literal
-            elif token is Name.NoHexIdentifier:
-                yield Number.Hex, last_offset, line_nr
-                token = Name.Identifier
-
-            yield token, literal, line_nr
+    @staticmethod
+    def preprocess(text: str) -> tuple[str, int]:
+        """
+        Normalize `text` as `get_tokens` does, and return it with the offset
+        where its trailing newlines begin. Only a single trailing newline is
+        left by `get_tokens`, which merely yields whitespace, so the tokens
+        from that offset on are dropped instead of copying the text, as dumps
+        are usually read as is.
+        """
+        if text.startswith("\ufeff"):
+            text = text[1:]
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        if text.startswith("\n"):
+            text = text.lstrip("\n")
+
+        end = len(text)
+        while end and text[end - 1] == "\n":
+            end -= 1
+        if end == len(text):
+            text += "\n"
+        return text, end
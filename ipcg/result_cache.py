@@ -0,0 +1,126 @@
+import hashlib
+import io
+import json
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass
+from importlib import metadata
+from pathlib import Path
+from typing import TextIO, override
+
+from .module_index import ModuleIndex
+
+CACHE_SUFFIX = ".json"
+DEFAULT_MAX_SIZE = 64 << 20
+# bumped whenever the printed output of the same dumps changes, such as
+# with the size inference
+RESULT_VERSION = 2
+
+
+def get_cache_dir() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "ipcg"
+
+
+def get_version() -> str:
+    try:
+        return metadata.version("ipcg")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResult:
+    stdout: str
+
+
+class OutputRecorder(io.StringIO):
+    """
+    Records the text written to it while passing it on to `target` as it
+    comes, so that the output of a query is cached without holding it back.
+    """
+
+    def __init__(self, target: TextIO) -> None:
+        super().__init__()
+        self._target = target
+
+    @override
+    def write(self, s: str, /) -> int:
+        _ = self._target.write(s)
+        return super().write(s)
+
+    @override
+    def flush(self) -> None:
+        self._target.flush()
+
+
+class ResultCache:
+    """
+    Printed output of queries, one file per query in `directory`. Entries are
+    keyed by the content of the dumps they were printed from, so a changed
+    dump is never answered from the cache. The least recently used entries
+    are evicted once the entries take up more than `max_size` bytes.
+    """
+
+    def __init__(self, directory: Path, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self.directory = directory
+        self.max_size = max_size
+
+    @staticmethod
+    def make_key(dumps: Iterable[Path], *query: str) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        for part in (
+            get_version(),
+            str(RESULT_VERSION),
+            *(ModuleIndex.load(dump).digest for dump in dumps),
+            *query,
+        ):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> CachedResult | None:
+        path = self.directory / f"{key}{CACHE_SUFFIX}"
+        try:
+            with path.open("r") as f:
+                data = json.load(f)
+            # the modification time orders the entries for eviction
+            os.utime(path)
+            return CachedResult(data["stdout"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, result: CachedResult) -> None:
+        path = self.directory / f"{key}{CACHE_SUFFIX}"
+        # written aside and moved in place, so that a concurrent run never
+        # reads a partial entry
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with temporary.open("w") as f:
+                json.dump({"stdout": result.stdout}, f)
+            _ = temporary.replace(path)
+        except OSError:
+            # an unwritable cache only costs us the query on the next run
+            temporary.unlink(missing_ok=True)
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        entries: list[tuple[int, int, Path]] = []
+        for path in self.directory.glob(f"*{CACHE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,130 @@
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from .statement import Class, Size
+
+
+@dataclass(slots=True)
+class _Constraints:
+    """
+    The evidence about the size of a class, gathered from all of its
+    instances: its class statement and every base it appears as.
+    """
+
+    instances: list[Class] = field(default_factory=list)
+    # the smallest distance to the next base in a class deriving from it,
+    # which is taken as its size
+    gap: int | None = None
+    has_vtable: bool = False
+    # (offset, identifier) of the last bases of its instances, whose ends
+    # bound its size from below
+    last_bases: set[tuple[int, str]] = field(default_factory=set)
+
+
+class SizeInference:
+    """
+    Infers the sizes of classes from the offsets of the bases of every class
+    deriving from them. A class followed by another base is as large as the
+    smallest gap to the next base, and otherwise at least as large as the end
+    of its last base, or its vtable pointer. All instances of a class get the
+    same size, whatever order the classes were resolved in.
+    """
+
+    def __init__(self) -> None:
+        # in the order the classes were found, derived before bases
+        self._constraints: dict[str, _Constraints] = {}
+        # the classes whose lower bound depends on the size of a class
+        self._dependents: dict[str, set[str]] = {}
+        self._visited: set[Class] = set()
+
+    def add(self, classes: Iterable[Class]) -> None:
+        """
+        Collect the constraints of `classes` and all of their bases.
+        """
+        for cls in classes:
+            stack = [cls]
+            while stack:
+                instance = stack.pop()
+                if instance in self._visited:
+                    continue
+                self._visited.add(instance)
+
+                constraints = self._get_constraints(instance.identifier)
+                constraints.instances.append(instance)
+                if instance.vtable:
+                    constraints.has_vtable = True
+
+                bases = instance.bases
+                if not bases:
+                    continue
+                last_base = bases[-1]
+                constraints.last_bases.add((last_base.offset, last_base.identifier))
+                self._dependents.setdefault(last_base.identifier, set()).add(
+                    instance.identifier
+                )
+                for base, next_base in zip(bases, bases[1:]):
+                    gap = next_base.offset - base.offset
+                    base_constraints = self._get_constraints(base.identifier)
+                    if base_constraints.gap is None or gap < base_constraints.gap:
+                        base_constraints.gap = gap
+                stack.extend(bases)
+
+    def solve(self) -> None:
+        """
+        Solve the constraints to a fixpoint and set the sizes of all
+        instances.
+        """
+        sizes: dict[str, int] = {}
+        # bases were mostly found after the classes deriving from them, so
+        # the reverse order leaves little to be done again
+        worklist = deque(reversed(self._constraints))
+        queued = set(self._constraints)
+        updates = dict.fromkeys(self._constraints, 0)
+        while worklist:
+            identifier = worklist.popleft()
+            queued.remove(identifier)
+
+            size = self._get_size(self._constraints[identifier], sizes)
+            if identifier in sizes and sizes[identifier] == size:
+                continue
+            sizes[identifier] = size
+
+            # lower bounds only grow, but classes inheriting from each other
+            # by name would grow without end
+            updates[identifier] += 1
+            if updates[identifier] > len(self._constraints):
+                continue
+            for dependent in self._dependents.get(identifier, ()):
+                if dependent not in queued and self._constraints[dependent].gap is None:
+                    worklist.append(dependent)
+                    queued.add(dependent)
+
+        for identifier, constraints in self._constraints.items():
+            size = Size(sizes[identifier], constraints.gap is not None)
+            for instance in constraints.instances:
+                instance.share_size(size)
+
+    def _get_constraints(self, identifier: str) -> _Constraints:
+        if identifier not in self._constraints:
+            self._constraints[identifier] = _Constraints()
+        return self._constraints[identifier]
+
+    @staticmethod
+    def _get_size(constraints: _Constraints, sizes: dict[str, int]) -> int:
+        if constraints.gap is not None:
+            return constraints.gap
+        size = 8 if constraints.has_vtable else 0
+        for offset, base in constraints.last_bases:
+            size = max(size, offset + sizes.get(base, 0))
+        return size
+
+
+def infer_sizes(classes: Iterable[Class]) -> None:
+    """
+    Infer the sizes of `classes` and all of their bases together. Class names
+    are only unique within a module, so the classes should be of one module.
+    """
+    inference = SizeInference()
+    inference.add(classes)
+    inference.solve()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from array import array
 from dataclasses import InitVar, dataclass, field
 from typing import final, override
 
@@ -30,6 +31,11 @@ class Statement:
 class ModuleBlock[T: Statement](Statement):
     module: str
     statements: list[T]
+    # filled in by the parsers: classes by identifier and vtables without an
+    # owner by the identifier of their class, the last one of a name winning
+    symbols: dict[str, T] = field(default_factory=dict)
+    # vtables with an owner, by owner and the identifier of their class
+    owned_symbols: dict[tuple[str, str], T] = field(default_factory=dict)
 
     @override
     def accept(self, visitor: Statement.Visitor) -> None:
@@ -42,6 +48,11 @@ class ModuleBlock[T: Statement](Statement):
     __repr__ = __str__
 
 
+# vtables bound to the bases of a class, keyed by the path to the base, that
+# take precedence over the vtable of the base itself
+type VTableBindings = dict[tuple[Class, ...], VTable | None]
+
+
 @final
 class Class(Statement):
     _class_sizes: dict[str, Size] = {}
@@ -51,6 +62,7 @@ class Class(Statement):
     offset: int
     _size: Size
     vtable: VTable | None
+    vtable_bindings: VTableBindings
     is_faulty: bool
 
     def __init__(
@@ -68,12 +80,15 @@ class Class(Statement):
             Class._class_sizes[identifier] = Size(size)
         self._size = self._class_sizes[identifier]
         self.vtable = vtable
+        self.vtable_bindings = {}
         self.is_faulty = False
 
-    def set_size(self, size: int, is_determined: bool) -> None:
-        if self._size.is_determined:
-            return
-        self._size = Size(size, is_determined)
+    def share_size(self, size: Size) -> None:
+        """
+        Replace the size of the class with `size`, which is shared with the
+        other instances of the class.
+        """
+        self._size = size
 
     def get_size(self) -> int:
         return self._size.size
@@ -81,11 +96,18 @@ class Class(Statement):
     def is_determined_size(self) -> bool:
         return self._size.is_determined
 
-    def clone(self) -> Class:
-        bases: list[Class] = [base.clone() for base in self.bases]
-        new_class = Class(self.identifier, bases, self.offset, self._size.size)
-        new_class.vtable = self.vtable
-        return new_class
+    def get_base_vtable(self, path: tuple[Class, ...]) -> VTable | None:
+        """
+        Return the vtable of the base reached through `path`, where every
+        class in `path` is one of the bases of the one before it. Bases can
+        be shared with other classes, so the vtable bound to the base by this
+        class takes precedence over the one of the base itself.
+        """
+        if not path:
+            return self.vtable
+        if path in self.vtable_bindings:
+            return self.vtable_bindings[path]
+        return path[-1].vtable
 
     @override
     def accept(self, visitor: Statement.Visitor) -> None:
@@ -122,7 +144,16 @@ class VTable(Statement):
     owner: str
     identifier: str
     vtable_count: int
-    vtable_entry_list: list[VTableEntry]
+    # the entries, or their fields as parsed until they are first accessed
+    entries: list[VTableEntry] | VTableEntryFields
+    # the identifier of the class, without the vftable suffix
+    class_identifier: str = ""
+
+    @property
+    def vtable_entry_list(self) -> list[VTableEntry]:
+        if isinstance(self.entries, VTableEntryFields):
+            self.entries = self.entries.materialize()
+        return self.entries
 
     @override
     def accept(self, visitor: Statement.Visitor) -> None:
@@ -135,6 +166,26 @@ class VTable(Statement):
     __repr__ = __str__
 
 
+@final
+@dataclass(slots=True)
+class VTableEntryFields:
+    """
+    The fields of the entries of a vtable, kept compact until the entries are
+    built.
+    """
+
+    # the index, address and relative address of every entry in turn
+    numbers: array[int] = field(default_factory=lambda: array("Q"))
+    function_identifiers: list[str] = field(default_factory=list)
+
+    def materialize(self) -> list[VTableEntry]:
+        numbers = self.numbers
+        return [
+            VTableEntry(numbers[i * 3], numbers[i * 3 + 1], numbers[i * 3 + 2], identifier)
+            for i, identifier in enumerate(self.function_identifiers)
+        ]
+
+
 @final
 @dataclass
 class VTableEntry(Statement):
@@ -164,6 +215,10 @@ class LinkedModuleBlock(Statement):
     module: str
     classes: list[Class]
     vtables: list[VTable]
+    # the symbols of the linked modules
+    type_symbols: dict[str, Class] = field(default_factory=dict)
+    vtable_symbols: dict[str, VTable] = field(default_factory=dict)
+    vtable_owned_symbols: dict[tuple[str, str], VTable] = field(default_factory=dict)
 
     @override
     def accept(self, visitor: Statement.Visitor) -> None:
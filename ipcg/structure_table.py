@@ -0,0 +1,184 @@
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import final
+
+from .statement import Class, ModuleBlock, VTable
+
+# identifier, offset and the structure ids of the bases
+type _ClassKey = tuple[str, int, tuple[int, ...]]
+# that of a class statement, and the slot count of its vtable
+type _StatementKey = tuple[str, int, tuple[int, ...], int]
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class DuplicationReport:
+    """
+    How much of the parsed modules of a game repeats. A definition is shared
+    when class statements of the same structure, and with vtables of as many
+    slots, are found in several modules.
+    """
+
+    modules: int
+    statements: int
+    definitions: int
+    shared_definitions: int
+    # the statements beyond the first of every shared definition
+    duplicate_statements: int
+    parsed_bases: int
+    distinct_bases: int
+    vtables: int
+    shared_vtable_shapes: int
+    duplicate_vtables: int
+    # (identifier, number of modules) of the most widely shared definitions
+    most_shared: list[tuple[str, int]]
+
+    def __str__(self) -> str:
+        lines = [
+            f"Modules: {self.modules}",
+            f"Class statements: {self.statements}, {self.definitions} distinct",
+            f"Definitions in several modules: {self.shared_definitions}, "
+            + f"repeated by {self.duplicate_statements} statements",
+            f"Parsed bases: {self.parsed_bases}, shared as {self.distinct_bases}",
+            f"VTables: {self.vtables}, {self.shared_vtable_shapes} shapes in several "
+            + f"modules, repeated by {self.duplicate_vtables} vtables",
+        ]
+        lines.extend(
+            f"{count}\t{identifier}" for identifier, count in self.most_shared
+        )
+        return "\n".join(lines)
+
+
+class StructureTable:
+    """
+    Hash-conses parsed classes. A class is known by its identifier, offset and
+    the structures of its bases, and the parsed bases of the same structure,
+    in any module, are one shared instance with a small structure id. Parsed
+    bases are only ever read by the resolver; class statements are resolved
+    in place, so they stay per module and hold what differs between modules:
+    their vtables, resolved bases and sizes.
+    """
+
+    def __init__(self) -> None:
+        self._bases: dict[_ClassKey, Class] = {}
+        self._ids: dict[Class, int] = {}
+        self._statement_ids: dict[_StatementKey, int] = {}
+        self.parsed_bases = 0
+
+    def intern_bases(self, statement: Class) -> None:
+        """
+        Replace the bases of `statement` with their shared instances.
+        """
+        statement.bases = [self._intern(base) for base in statement.bases]
+
+    def get_statement_id(self, statement: Class, vtable: VTable | None) -> int:
+        """
+        Return the structure id of a class statement whose bases were
+        interned, and whose own vtable is `vtable`. Statements of the same
+        structure and vtable slot count get the same id.
+        """
+        key = (
+            statement.identifier,
+            statement.offset,
+            self._get_base_ids(statement.bases),
+            vtable.vtable_count if vtable else -1,
+        )
+        if key not in self._statement_ids:
+            self._statement_ids[key] = len(self._statement_ids)
+        return self._statement_ids[key]
+
+    def report(
+        self,
+        class_modules: list[ModuleBlock[Class]],
+        vtable_modules: list[ModuleBlock[VTable]],
+        top: int = 10,
+    ) -> DuplicationReport:
+        """
+        Report the definitions and vtables repeated across `class_modules` and
+        `vtable_modules`, with the `top` most widely shared definitions.
+        """
+        statement_modules: dict[int, set[str]] = {}
+        statement_counts: Counter[int] = Counter()
+        identifiers: dict[int, str] = {}
+        vtable_symbols = {
+            vtable_module.module: vtable_module.symbols for vtable_module in vtable_modules
+        }
+        for class_module in class_modules:
+            vtables = vtable_symbols.get(class_module.module, {})
+            for statement in class_module.statements:
+                statement_id = self.get_statement_id(
+                    statement, vtables.get(statement.identifier)
+                )
+                statement_modules.setdefault(statement_id, set()).add(class_module.module)
+                statement_counts[statement_id] += 1
+                identifiers[statement_id] = statement.identifier
+        shared = [
+            statement_id
+            for statement_id, modules in statement_modules.items()
+            if len(modules) > 1
+        ]
+
+        # vtables differ in their addresses between modules, so only their
+        # shapes are compared
+        vtable_modules_by_shape: dict[tuple[str, str, int], set[str]] = {}
+        vtable_counts: Counter[tuple[str, str, int]] = Counter()
+        for vtable_module in vtable_modules:
+            for vtable in vtable_module.statements:
+                shape = (vtable.owner, vtable.identifier, vtable.vtable_count)
+                vtable_modules_by_shape.setdefault(shape, set()).add(vtable_module.module)
+                vtable_counts[shape] += 1
+        shared_shapes = [
+            shape for shape, modules in vtable_modules_by_shape.items() if len(modules) > 1
+        ]
+
+        def by_modules(statement_id: int) -> tuple[int, str]:
+            return -len(statement_modules[statement_id]), identifiers[statement_id]
+
+        most_shared = sorted(shared, key=by_modules)[:top]
+        return DuplicationReport(
+            modules=len({module.module for module in class_modules}),
+            statements=statement_counts.total(),
+            definitions=len(statement_counts),
+            shared_definitions=len(shared),
+            duplicate_statements=sum(
+                statement_counts[statement_id] - 1 for statement_id in shared
+            ),
+            parsed_bases=self.parsed_bases,
+            distinct_bases=len(self._bases),
+            vtables=vtable_counts.total(),
+            shared_vtable_shapes=len(shared_shapes),
+            duplicate_vtables=sum(vtable_counts[shape] - 1 for shape in shared_shapes),
+            most_shared=[
+                (identifiers[statement_id], len(statement_modules[statement_id]))
+                for statement_id in most_shared
+            ],
+        )
+
+    def _intern(self, base: Class) -> Class:
+        # bases before the classes deriving from them, on an explicit stack
+        # of (class, its remaining bases, its interned bases)
+        stack: list[tuple[Class, Iterator[Class], list[Class]]] = [
+            (base, iter(base.bases), [])
+        ]
+        while True:
+            cls, bases, interned = stack[-1]
+            for next_base in bases:
+                stack.append((next_base, iter(next_base.bases), []))
+                break
+            else:
+                _ = stack.pop()
+                self.parsed_bases += 1
+                key = (cls.identifier, cls.offset, self._get_base_ids(interned))
+                if key in self._bases:
+                    cls = self._bases[key]
+                else:
+                    cls.bases = interned
+                    self._bases[key] = cls
+                    self._ids[cls] = len(self._ids)
+                if not stack:
+                    return cls
+                stack[-1][2].append(cls)
+
+    def _get_base_ids(self, bases: list[Class]) -> tuple[int, ...]:
+        return tuple(self._ids[base] for base in bases)
@@ -30,6 +30,8 @@ class Token:
     kind: TokenKind
     literal: str
     line: int
+    # the number of HEX and NUMBER tokens, converted by the lexer
+    value: int | None = None
 
     @classmethod
     def eof(cls) -> Token:
@@ -0,0 +1,195 @@
+import random
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from operator import eq
+from typing import final
+
+from .hierarchy import Hierarchy
+from .statement import Class
+
+# a Mersenne prime, for the universal hash standing in for a permutation
+_PRIME = (1 << 61) - 1
+
+NUM_BINS = 64
+BANDS = 16
+
+type ClassKey = tuple[str, str]
+type Signature = tuple[int, ...]
+
+
+def get_features(cls: Class) -> set[int]:
+    """
+    Return the hashed features of the layout of `cls`: the relative address
+    of its vtable, the distances between the relative addresses of its slots,
+    which survive code moving as a whole, its slot count and size, and the
+    layout of its bases.
+    """
+    entries = cls.vtable.vtable_entry_list if cls.vtable else []
+    # shared by many unrelated classes on their own, so they are one feature
+    features: list[tuple[int, ...]] = [
+        (0, len(entries), cls.get_size(), cls.is_determined_size())
+    ]
+    if vtable := cls.vtable:
+        features.append((1, vtable.relative_address))
+    for previous, entry in zip(entries, entries[1:]):
+        features.append((2, entry.index, entry.relative_address - previous.relative_address))
+    for position, base in enumerate(cls.bases):
+        # bound by this class, since the base is shared
+        base_vtable = cls.get_base_vtable((base,))
+        base_slots = base_vtable.vtable_count if base_vtable else -1
+        features.append((3, position, base.offset, base_slots, base.get_size()))
+    return {hash(feature) % _PRIME for feature in features}
+
+
+@final
+class MinHasher:
+    """
+    Computes MinHash signatures, whose share of equal values estimates the
+    Jaccard similarity of the feature sets they were computed from. A single
+    hash is split into `num_bins` bins, each keeping its minimum, rather than
+    hashing every feature once per value. Bins no feature fell into borrow
+    the value of another bin, probed in an order of their own, so that
+    borrowed values collide no more often than hashed ones. The hash is drawn
+    from `seed`, so signatures are only comparable between hashers of the
+    same seed.
+    """
+
+    def __init__(self, num_bins: int = NUM_BINS, seed: int = 1) -> None:
+        rng = random.Random(seed)
+        self.num_bins = num_bins
+        self._a = rng.randrange(1, _PRIME)
+        self._b = rng.randrange(_PRIME)
+        self._probes = [rng.sample(range(num_bins), num_bins) for _ in range(num_bins)]
+
+    def signature(self, features: Iterable[int]) -> Signature:
+        num_bins = self.num_bins
+        a = self._a
+        b = self._b
+        bins: list[int | None] = [None] * num_bins
+        for feature in features:
+            value, index = divmod((a * feature + b) % _PRIME, num_bins)
+            minimum = bins[index]
+            if minimum is None or value < minimum:
+                bins[index] = value
+        if all(value is None for value in bins):
+            return (0,) * num_bins
+
+        signature = [0] * num_bins
+        for index, value in enumerate(bins):
+            if value is not None:
+                signature[index] = value
+                continue
+            for probe in self._probes[index]:
+                if (borrowed := bins[probe]) is not None:
+                    signature[index] = borrowed
+                    break
+        return tuple(signature)
+
+
+def estimate_similarity(a: Signature, b: Signature) -> float:
+    return sum(map(eq, a, b)) / len(a)
+
+
+@final
+class LSHIndex:
+    """
+    Finds the signatures likely to be similar to a signature without
+    comparing it to all of them. Signatures are cut into `bands`, and those
+    with an equal band become candidates; with r rows per band, pairs of
+    similarity s are found with probability 1 - (1 - s^r)^bands. Equal
+    signatures are kept once, with all of their keys.
+    """
+
+    def __init__(self, bands: int = BANDS) -> None:
+        self.bands = bands
+        self._buckets: list[dict[Signature, list[Signature]]] = [{} for _ in range(bands)]
+        self._keys: dict[Signature, list[ClassKey]] = {}
+
+    def add(self, key: ClassKey, signature: Signature) -> None:
+        if signature in self._keys:
+            self._keys[signature].append(key)
+            return
+        self._keys[signature] = [key]
+        for bucket, band in zip(self._buckets, self._iter_bands(signature)):
+            bucket.setdefault(band, []).append(signature)
+
+    def query(self, signature: Signature) -> Iterator[tuple[Signature, list[ClassKey]]]:
+        """
+        Yield the candidate signatures for `signature`, with their keys.
+        """
+        seen: set[Signature] = set()
+        for bucket, band in zip(self._buckets, self._iter_bands(signature)):
+            for candidate in bucket.get(band, ()):
+                if candidate not in seen:
+                    seen.add(candidate)
+                    yield candidate, self._keys[candidate]
+
+    def _iter_bands(self, signature: Signature) -> Iterator[Signature]:
+        rows = len(signature) // self.bands
+        for start in range(0, rows * self.bands, rows):
+            yield signature[start : start + rows]
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class VersionMatch:
+    old: ClassKey
+    new: ClassKey
+    similarity: float
+
+
+def fingerprint_classes(hierarchy: Hierarchy, hasher: MinHasher) -> dict[ClassKey, Signature]:
+    """
+    Return the signatures of the class statements of `hierarchy` by module
+    and name. Classes without a vtable have too little in their layout to be
+    told apart, so they are left out.
+    """
+    signatures: dict[ClassKey, Signature] = {}
+    for view in hierarchy.iter_classes():
+        key = (view.module, view.name)
+        if view.statement.vtable is None or key in signatures:
+            continue
+        signatures[key] = hasher.signature(get_features(view.statement))
+    return signatures
+
+
+def match_versions(old: Hierarchy, new: Hierarchy, threshold: float = 0.5) -> list[VersionMatch]:
+    """
+    Map the classes of `old` to those of `new` by the similarity of their
+    layouts, each class at most once. Of equally similar candidates, those
+    keeping their name and then their module are preferred. The matches are
+    in the order of the classes of `new`.
+    """
+    hasher = MinHasher()
+    index = LSHIndex()
+    for key, signature in fingerprint_classes(old, hasher).items():
+        index.add(key, signature)
+
+    new_signatures = fingerprint_classes(new, hasher)
+    candidates: list[tuple[float, bool, bool, ClassKey, ClassKey]] = []
+    for new_key, signature in new_signatures.items():
+        for candidate, old_keys in index.query(signature):
+            similarity = estimate_similarity(signature, candidate)
+            if similarity < threshold:
+                continue
+            for old_key in old_keys:
+                candidates.append(
+                    (
+                        similarity,
+                        old_key[1] == new_key[1],
+                        old_key[0] == new_key[0],
+                        old_key,
+                        new_key,
+                    )
+                )
+
+    # greedily, most similar first
+    candidates.sort(key=lambda candidate: candidate[:3], reverse=True)
+    matched_old: set[ClassKey] = set()
+    matches: dict[ClassKey, VersionMatch] = {}
+    for similarity, _, _, old_key, new_key in candidates:
+        if old_key in matched_old or new_key in matches:
+            continue
+        matched_old.add(old_key)
+        matches[new_key] = VersionMatch(old_key, new_key, similarity)
+    return [matches[key] for key in new_signatures if key in matches]
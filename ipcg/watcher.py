@@ -0,0 +1,120 @@
+import sys
+from pathlib import Path
+
+from .class_resolver import ClassResolver
+from .exeptions import LexerException, ParseException, StaleIndexException
+from .lexer import LexerProvider
+from .module_index import ModuleIndex
+from .module_linker import ModuleLinker
+from .parser import InheritanceParser, VTableParser
+from .statement import Class, LinkedModuleBlock, ModuleBlock, VTable
+
+type _DumpStat = tuple[int, int]
+
+
+def _stat(path: Path) -> _DumpStat:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+class GameWatcher:
+    """
+    Keeps the resolved modules of a game in step with its dumps. Changes are
+    found by polling the size and modification time of the dumps, and only
+    the modules whose blocks differ from the last poll are parsed and
+    resolved again.
+    """
+
+    def __init__(self, inheritance: Path, vtable: Path, lexer: LexerProvider) -> None:
+        self.inheritance = inheritance
+        self.vtable = vtable
+        self.lexer = lexer
+        self._stats: tuple[_DumpStat, _DumpStat] | None = None
+        self._pending_stats: tuple[_DumpStat, _DumpStat] | None = None
+        self._indices: tuple[ModuleIndex, ModuleIndex] | None = None
+
+    def load(self) -> list[LinkedModuleBlock]:
+        """
+        Parse and resolve every module of the game.
+        """
+        self._stats = (_stat(self.inheritance), _stat(self.vtable))
+        indices = (ModuleIndex.load(self.inheritance), ModuleIndex.load(self.vtable))
+        modules = list(indices[0].modules | indices[1].modules)
+        linked_modules = self._resolve(indices, modules)
+        self._indices = indices
+        return linked_modules
+
+    def poll(self) -> list[LinkedModuleBlock]:
+        """
+        Return the modules that changed since the last poll, parsed and
+        resolved again. A change is only picked up once the dumps kept their
+        size and modification time for a whole poll, so that a dump is not
+        read while it is still being written.
+        """
+        try:
+            stats = (_stat(self.inheritance), _stat(self.vtable))
+        except OSError:
+            # the dumper may be replacing the file
+            return []
+        if stats == self._stats:
+            self._pending_stats = None
+            return []
+        if stats != self._pending_stats:
+            self._pending_stats = stats
+            return []
+        self._stats = stats
+        self._pending_stats = None
+
+        indices = (ModuleIndex.load(self.inheritance), ModuleIndex.load(self.vtable))
+        modules = self._get_changed_modules(indices)
+        try:
+            linked_modules = self._resolve(indices, modules)
+        except (LexerException, ParseException, StaleIndexException) as e:
+            # the old indices are kept, so the modules are compared against
+            # the last good dumps on the next change
+            print(f"{self.inheritance.parent.name}: {e}", file=sys.stderr)
+            return []
+        self._indices = indices
+        return linked_modules
+
+    def _get_changed_modules(self, indices: tuple[ModuleIndex, ModuleIndex]) -> list[str]:
+        assert self._indices is not None
+        changed: list[str] = []
+        for old_index, index in zip(self._indices, indices):
+            for module, module_range in index.modules.items():
+                old_range = old_index.modules.get(module)
+                if old_range is None or old_range.digest != module_range.digest:
+                    changed.append(module)
+            for module in old_index.modules:
+                if module not in index.modules:
+                    print(f"{module} was removed from {index.path.name}", file=sys.stderr)
+        return list(dict.fromkeys(changed))
+
+    def _resolve(
+        self, indices: tuple[ModuleIndex, ModuleIndex], modules: list[str]
+    ) -> list[LinkedModuleBlock]:
+        class_modules: list[ModuleBlock[Class]] = []
+        vtable_modules: list[ModuleBlock[VTable]] = []
+        for module in modules:
+            # a module is parsed from both dumps even if only one of them
+            # changed, since resolving modifies the statements of both
+            if module_range := indices[0].modules.get(module):
+                text = indices[0].read(module_range)
+                class_modules.extend(
+                    InheritanceParser(self.lexer.tokenize(text, module_range.line)).parse()
+                )
+            if module_range := indices[1].modules.get(module):
+                text = indices[1].read(module_range)
+                vtable_modules.extend(
+                    VTableParser(self.lexer.tokenize(text, module_range.line)).parse()
+                )
+
+        linker = ModuleLinker(class_modules, vtable_modules)
+        linked_modules: list[LinkedModuleBlock] = []
+        for module in modules:
+            if linked_module := linker.link(module):
+                linked_modules.append(linked_module)
+
+        resolver = ClassResolver()
+        resolver.resolve(linked_modules)
+        return linked_modules
@@ -1,16 +1,22 @@
+from __future__ import annotations
+
 import argparse
 import os.path
 import signal
+import sys
 from configparser import ConfigParser
-from dataclasses import dataclass
-from pathlib import Path
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, NamedTuple
+
+# The parsing, resolving and printing modules are imported inside the commands
+# that use them, so that light commands like get-path and list-games start fast.
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+    from pathlib import Path
 
-from ipcg.class_resolver import ClassResolver
-from ipcg.lexer import LexerBackend, get_lexer_provider
-from ipcg.method_printer import Printer as MethodPrinter
-from ipcg.module_linker import link_modules
-from ipcg.module_printer import Printer as ModulePrinter
-from ipcg.parser import InheritanceParser, VTableParser
+    from ipcg.graph_exporter import GraphFormat
+    from ipcg.lexer import LexerBackend
+    from ipcg.hierarchy import Hierarchy
 
 _ = signal.signal(signal.SIGPIPE, signal.SIG_DFL)
 
@@ -60,7 +66,11 @@ def check_file_presence(inheritance: Path, vtable: Path) -> None:
         raise FileNotFoundError(exception)
 
 
-def load_game_class_files(config: ConfigParser, identifier: str) -> tuple[str, str]:
+def get_dump_paths(config: ConfigParser, identifier: str) -> tuple[Path, Path]:
+    from pathlib import Path
+
+    from ipcg.loader import find_dump_file
+
     try:
         directory = Path(config["Paths"]["class_dumper_dir"])
     except KeyError:
@@ -71,17 +81,43 @@ def load_game_class_files(config: ConfigParser, identifier: str) -> tuple[str, s
     game_dir = directory / identifier
     if not game_dir.is_dir():
         raise Exception("Game folder did not exist.")
-    inheritance = game_dir / "inheritance.txt"
-    vtable = game_dir / "vtable.txt"
+    inheritance = find_dump_file(game_dir, "inheritance.txt")
+    vtable = find_dump_file(game_dir, "vtable.txt")
 
     check_file_presence(inheritance, vtable)
+    return inheritance, vtable
+
 
-    with inheritance.open("r") as f:
-        inheritance_text = f.read()
-    with vtable.open("r") as f:
-        vtable_text = f.read()
+def load_game_hierarchy(
+    config: ConfigParser, identifier: str, lexer_backend: LexerBackend, module: str = ""
+) -> Hierarchy:
+    from ipcg.api import resolve_game
 
-    return inheritance_text, vtable_text
+    inheritance, vtable = get_dump_paths(config, identifier)
+    return resolve_game(inheritance, vtable, lexer=lexer_backend, module=module)
+
+
+def load_stored_hierarchy(
+    config: ConfigParser,
+    game: str,
+    lexer_backend: LexerBackend,
+    module: str = "",
+    identifier: str = "",
+) -> Hierarchy:
+    """
+    Load the hierarchy of `game` from its store, writing the store first when
+    it is missing or older than the dumps.
+    """
+    from ipcg.hierarchy_store import SCHEMA_VERSION, HierarchyStore, get_store_path
+    from ipcg.result_cache import ResultCache
+
+    dumps = get_dump_paths(config, game)
+    store = HierarchyStore(get_store_path(dumps[0].parent))
+    source = ResultCache.make_key(dumps, "hierarchy-store", str(SCHEMA_VERSION))
+    if store.get_source() != source:
+        print(f"Writing the hierarchy of {game} to {store.path}", file=sys.stderr)
+        store.write(load_game_hierarchy(config, game, lexer_backend), source)
+    return store.load(module, identifier)
 
 
 def scan_game_classes(
@@ -90,72 +126,331 @@ def scan_game_classes(
     game: str,
     module: str = "",
     identifier: str = "",
+    jobs: int = 1,
     lexer_backend: LexerBackend,
+    db: bool = False,
 ) -> None:
-    inheritance_text, vtable_text = load_game_class_files(config, game)
-    lexer = get_lexer_provider(lexer_backend)
-    inheritance_tokens = lexer.tokenize(inheritance_text)
+    from ipcg.module_printer import Printer as ModulePrinter
+
+    if db:
+        hierarchy = load_stored_hierarchy(config, game, lexer_backend, module, identifier)
+    else:
+        hierarchy = load_game_hierarchy(config, game, lexer_backend, module)
+    printer = (
+        ModulePrinter(module, identifier, jobs) if identifier else ModulePrinter(jobs=jobs)
+    )
+    printer.print(hierarchy)
 
-    # for nr, token in enumerate(inheritance_tokens):
-    #     print(nr, token)
-    # raise SystemExit(1)
 
-    vtable_tokens = lexer.tokenize(vtable_text)
+def scan_game_methods(
+    config: ConfigParser,
+    *,
+    game: str,
+    module: str,
+    identifier: str = "",
+    lexer_backend: LexerBackend,
+    db: bool = False,
+) -> None:
+    from ipcg.method_printer import Printer as MethodPrinter
 
-    inheritance_parser = InheritanceParser(inheritance_tokens)
-    vtable_parser = VTableParser(vtable_tokens)
+    # the virtual methods of a class are found among all classes of the module
+    if db:
+        hierarchy = load_stored_hierarchy(config, game, lexer_backend, module)
+    else:
+        hierarchy = load_game_hierarchy(config, game, lexer_backend, module)
 
-    class_modules = inheritance_parser.parse()
-    vtable_modules = vtable_parser.parse()
+    printer = MethodPrinter(module, identifier) if identifier else MethodPrinter(module)
+    printer.print(hierarchy)
 
-    linked_modules = link_modules(class_modules, vtable_modules)
 
-    resolver = ClassResolver()
-    resolver.resolve(linked_modules)
+def run_cached_query(
+    config: ConfigParser,
+    run: Callable[[], None],
+    *,
+    command: str,
+    game: str,
+    module: str = "",
+    identifier: str = "",
+    lexer_backend: LexerBackend,
+) -> None:
+    """
+    Print the output of `run`, or replay it from the result cache when the
+    same query was printed from the same dumps before. Only the printed
+    classes or methods are cached; diagnostics go to stderr as they happen
+    and are not replayed, since some, like the writing of the store of a
+    game, only happen once.
+    """
+    from contextlib import redirect_stdout
+
+    from ipcg.result_cache import CachedResult, OutputRecorder, ResultCache, get_cache_dir
+
+    cache = ResultCache(get_cache_dir())
+    # --db is not part of the key: the store is written from the same dumps
+    # the key is made of, and answers with the same output as parsing them
+    key = cache.make_key(
+        get_dump_paths(config, game), command, module, identifier, lexer_backend
+    )
+    if cached := cache.get(key):
+        _ = sys.stdout.write(cached.stdout)
+        return
 
-    printer = ModulePrinter(module, identifier) if identifier else ModulePrinter()
-    printer.print(linked_modules)
+    stdout = OutputRecorder(sys.stdout)
+    with redirect_stdout(stdout):
+        run()
+    cache.put(key, CachedResult(stdout.getvalue()))
 
 
-def scan_game_methods(
+def export_game_graph(
     config: ConfigParser,
     *,
     game: str,
-    module: str,
-    identifier: str = "",
+    module: str = "",
+    graph_format: GraphFormat,
+    output: str = "",
     lexer_backend: LexerBackend,
 ) -> None:
-    inheritance_text, vtable_text = load_game_class_files(config, game)
-    lexer = get_lexer_provider(lexer_backend)
-    inheritance_tokens = lexer.tokenize(inheritance_text)
-    vtable_tokens = lexer.tokenize(vtable_text)
+    from ipcg.graph_exporter import Exporter, get_graph_writer
+
+    hierarchy = load_game_hierarchy(config, game, lexer_backend, module)
 
-    inheritance_parser = InheritanceParser(inheritance_tokens)
-    vtable_parser = VTableParser(vtable_tokens)
+    with open(output, "w") if output else nullcontext(sys.stdout) as f:
+        exporter = Exporter(get_graph_writer(graph_format, f))
+        exporter.export(hierarchy.linked_modules)
 
-    class_modules = inheritance_parser.parse()
-    vtable_modules = vtable_parser.parse()
 
-    linked_modules = link_modules(class_modules, vtable_modules)
+def watch_game(
+    config: ConfigParser, *, game: str, interval: float, lexer_backend: LexerBackend
+) -> None:
+    import time
 
-    resolver = ClassResolver()
-    resolver.resolve(linked_modules)
+    from ipcg.lexer import get_lexer_provider
+    from ipcg.loader import is_compressed
+    from ipcg.hierarchy import Hierarchy
+    from ipcg.module_printer import Printer as ModulePrinter
+    from ipcg.watcher import GameWatcher
 
-    printer = MethodPrinter(module, identifier) if identifier else MethodPrinter(module)
-    printer.print(linked_modules)
+    inheritance, vtable = get_dump_paths(config, game)
+    if is_compressed(inheritance) or is_compressed(vtable):
+        raise Exception("Watching needs uncompressed dumps.")
 
+    watcher = GameWatcher(inheritance, vtable, get_lexer_provider(lexer_backend))
+    ModulePrinter().print(Hierarchy(watcher.load()))
+    _ = sys.stdout.flush()
 
-def list_games(config: ConfigParser):
+    try:
+        while True:
+            time.sleep(interval)
+            start = time.perf_counter()
+            linked_modules = watcher.poll()
+            if not linked_modules:
+                continue
+            # every changed module is printed in full, like scan-module
+            for linked_module in linked_modules:
+                ModulePrinter().print(Hierarchy([linked_module]))
+            _ = sys.stdout.flush()
+            modules = ", ".join(linked_module.module for linked_module in linked_modules)
+            print(
+                f"Updated {modules} in {time.perf_counter() - start:.2f} s",
+                file=sys.stderr,
+            )
+    except KeyboardInterrupt:
+        pass
+
+
+def match_game_versions(
+    config: ConfigParser,
+    *,
+    old: str,
+    new: str,
+    threshold: float,
+    lexer_backend: LexerBackend,
+    db: bool = False,
+) -> None:
+    from ipcg.version_matching import match_versions
+
+    load = load_stored_hierarchy if db else load_game_hierarchy
+    matches = match_versions(
+        load(config, old, lexer_backend), load(config, new, lexer_backend), threshold
+    )
+    for match in matches:
+        (old_module, old_class), (new_module, new_class) = match.old, match.new
+        print(f"{old_module}\t{old_class}\t{new_module}\t{new_class}\t{match.similarity:.2f}")
+    print(f"Matched {len(matches)} classes", file=sys.stderr)
+
+
+def report_game_duplicates(
+    config: ConfigParser, *, game: str, lexer_backend: LexerBackend
+) -> None:
+    import asyncio
+
+    from ipcg import loader
+    from ipcg.lexer import get_lexer_provider
+    from ipcg.structure_table import StructureTable
+
+    inheritance, vtable = get_dump_paths(config, game)
+    structures = StructureTable()
+    class_modules, vtable_modules = asyncio.run(
+        loader.load_game(
+            inheritance, vtable, get_lexer_provider(lexer_backend), structures=structures
+        )
+    )
+    print(structures.report(class_modules, vtable_modules))
+
+
+def get_games(config: ConfigParser) -> list[str]:
     class_dumper_dir = get_config_path(config)
-    for game_dir in next(
+    return next(
         os.walk(
             class_dumper_dir,
         )
-    )[1]:
+    )[1]
+
+
+def list_games(config: ConfigParser):
+    for game_dir in get_games(config):
         print(game_dir)
 
 
-def build_parser() -> argparse.ArgumentParser:
+def get_game_size(config: ConfigParser, game: str) -> int:
+    """
+    Return the size of the dumps of `game`, leaving out the indexes and
+    stores written next to them. Games without dumps count as empty; their
+    error is reported once they are run.
+    """
+    try:
+        dumps = get_dump_paths(config, game)
+    except Exception:
+        return 0
+    return sum(dump.stat().st_size for dump in dumps)
+
+
+def _scan_game_to_file(
+    config: ConfigParser, game: str, output: str, *, lexer_backend: LexerBackend
+) -> float:
+    import time
+    from contextlib import redirect_stdout
+
+    start = time.perf_counter()
+    with open(output, "w") as f, redirect_stdout(f):
+        scan_game_classes(config, game=game, lexer_backend=lexer_backend)
+    return time.perf_counter() - start
+
+
+def _export_game_to_file(
+    config: ConfigParser,
+    game: str,
+    output: str,
+    *,
+    graph_format: GraphFormat,
+    lexer_backend: LexerBackend,
+) -> float:
+    import time
+
+    start = time.perf_counter()
+    export_game_graph(
+        config,
+        game=game,
+        graph_format=graph_format,
+        output=output,
+        lexer_backend=lexer_backend,
+    )
+    return time.perf_counter() - start
+
+
+def run_on_all_games(
+    config: ConfigParser,
+    task: Callable[[ConfigParser, str, str], float],
+    *,
+    output_dir: str,
+    extension: str,
+    jobs: int | None,
+) -> None:
+    """
+    Run `task` on every game on a shared process pool, writing the output of
+    each game to <game>.<extension> in `output_dir`, and print the time taken
+    per game.
+    """
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    from ipcg.exeptions import LexerException, ParseException
+
+    # largest games first, so that the pool is not left waiting on one big game
+    # after all the small ones are done; idle workers take the next game queued
+    sizes = {game: get_game_size(config, game) for game in get_games(config)}
+    games = sorted(sizes, key=sizes.__getitem__, reverse=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            game: executor.submit(
+                task, config, game, os.path.join(output_dir, f"{game}.{extension}")
+            )
+            for game in games
+        }
+
+        print(f"{'game':<24}{'size (MiB)':>12}{'seconds':>10}")
+        total = 0.0
+        for game, future in futures.items():
+            try:
+                seconds = future.result()
+            except (Exception, LexerException, ParseException) as e:
+                print(f"{game}: {e}", file=sys.stderr)
+                print(f"{game:<24}{sizes[game] / 2**20:>12.1f}{'failed':>10}")
+                continue
+            total += seconds
+            print(f"{game:<24}{sizes[game] / 2**20:>12.1f}{seconds:>10.2f}")
+
+    print(f"{'wall time':<36}{time.perf_counter() - start:>10.2f}")
+    print(f"{'sum of game times':<36}{total:>10.2f}")
+
+
+def scan_all_games(
+    config: ConfigParser,
+    *,
+    output_dir: str,
+    jobs: int | None,
+    lexer_backend: LexerBackend,
+) -> None:
+    from functools import partial
+
+    run_on_all_games(
+        config,
+        partial(_scan_game_to_file, lexer_backend=lexer_backend),
+        output_dir=output_dir,
+        extension="h",
+        jobs=jobs,
+    )
+
+
+def export_all_games(
+    config: ConfigParser,
+    *,
+    output_dir: str,
+    graph_format: GraphFormat,
+    jobs: int | None,
+    lexer_backend: LexerBackend,
+) -> None:
+    from functools import partial
+
+    run_on_all_games(
+        config,
+        partial(
+            _export_game_to_file, graph_format=graph_format, lexer_backend=lexer_backend
+        ),
+        output_dir=output_dir,
+        extension=graph_format,
+        jobs=jobs,
+    )
+
+
+def build_parser(argv: Sequence[str] | None = None) -> argparse.ArgumentParser:
+    """
+    Build the command line parser. When `argv` is given, only the subcommands
+    named in it get their arguments; the rest are registered by name alone,
+    which keeps the usage output complete without building every subparser.
+    """
     lexer_parent = argparse.ArgumentParser(add_help=False)
     _ = lexer_parent.add_argument(
         "--lexer",
@@ -165,111 +460,260 @@ def build_parser() -> argparse.ArgumentParser:
     )
 
     parser = argparse.ArgumentParser(prog="ipcg", description="IDA Pro Class Generator")
+    _ = parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the command with cProfile and write <command>.pstats",
+    )
+    _ = parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Also trace allocations and summarise them per ipcg module",
+    )
+    _ = parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="Number of modules in the allocation summary (default: 10)",
+    )
     sub = parser.add_subparsers(dest="command", required=True)
 
-    _ = sub.add_parser(
-        "get-path",
-        parents=[lexer_parent],
-        help="Show the current class-dumper directory",
-    )
+    def add_command(name: str, help: str) -> argparse.ArgumentParser | None:
+        if argv is not None and name not in argv:
+            _ = sub.add_parser(name, help=help)
+            return None
+        return sub.add_parser(name, parents=[lexer_parent], help=help)
+
+    def add_jobs_argument(sp: argparse.ArgumentParser) -> None:
+        _ = sp.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            metavar="N",
+            help=(
+                "Number of worker processes formatting the classes; without fork"
+                " the resolved classes are pickled to them (default: 1)"
+            ),
+        )
 
-    sp = sub.add_parser(
-        "set-path", parents=[lexer_parent], help="Set the class-dumper directory"
-    )
-    _ = sp.add_argument("path")
+    def add_no_cache_argument(sp: argparse.ArgumentParser) -> None:
+        _ = sp.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Neither read nor store the result in the result cache",
+        )
 
-    sp = sub.add_parser(
-        "scan-game",
-        parents=[lexer_parent],
-        help="List all modules and classes for a game",
-    )
-    _ = sp.add_argument("game")
+    def add_graph_format_argument(sp: argparse.ArgumentParser) -> None:
+        _ = sp.add_argument(
+            "--format",
+            choices=("jsonl", "dot", "graphml"),
+            default="jsonl",
+            help="Output format (default: jsonl)",
+        )
 
-    sp = sub.add_parser(
-        "scan-module",
-        parents=[lexer_parent],
-        help="List classes within a specific module",
-    )
-    _ = sp.add_argument("game")
-    _ = sp.add_argument("module")
+    def add_output_dir_argument(sp: argparse.ArgumentParser, files: str) -> None:
+        _ = sp.add_argument(
+            "--output",
+            default=".",
+            metavar="DIR",
+            help=f"Directory for the {files} files (default: current directory)",
+        )
 
-    sp = sub.add_parser(
-        "scan-class",
-        parents=[lexer_parent],
-        help="List a specific class across all modules",
-    )
-    _ = sp.add_argument("game")
-    _ = sp.add_argument("class_name", metavar="class")
+    def add_pool_jobs_argument(sp: argparse.ArgumentParser) -> None:
+        _ = sp.add_argument(
+            "--jobs",
+            type=int,
+            default=None,
+            metavar="N",
+            help="Number of worker processes (default: number of CPUs)",
+        )
 
-    sp = sub.add_parser(
-        "scan-methods",
-        parents=[lexer_parent],
-        help="List methods for all classes in a module",
-    )
-    _ = sp.add_argument("game")
-    _ = sp.add_argument("module")
+    def add_db_argument(sp: argparse.ArgumentParser) -> None:
+        _ = sp.add_argument(
+            "--db",
+            action="store_true",
+            help="Answer from the SQLite store of the game, writing it first if needed",
+        )
 
-    sp = sub.add_parser(
-        "scan-class-methods",
-        parents=[lexer_parent],
-        help="List methods for a specific class",
-    )
-    _ = sp.add_argument("game")
-    _ = sp.add_argument("module")
-    _ = sp.add_argument("class_name", metavar="class")
+    _ = add_command("get-path", "Show the current class-dumper directory")
+
+    if sp := add_command("set-path", "Set the class-dumper directory"):
+        _ = sp.add_argument("path")
+
+    if sp := add_command("scan-game", "List all modules and classes for a game"):
+        _ = sp.add_argument("game")
+        add_jobs_argument(sp)
+        add_db_argument(sp)
+
+    if sp := add_command("scan-module", "List classes within a specific module"):
+        _ = sp.add_argument("game")
+        _ = sp.add_argument("module")
+        add_jobs_argument(sp)
+        add_db_argument(sp)
+
+    if sp := add_command("scan-class", "List a specific class across all modules"):
+        _ = sp.add_argument("game")
+        _ = sp.add_argument("class_name", metavar="class")
+        add_jobs_argument(sp)
+        add_no_cache_argument(sp)
+        add_db_argument(sp)
+
+    if sp := add_command("scan-methods", "List methods for all classes in a module"):
+        _ = sp.add_argument("game")
+        _ = sp.add_argument("module")
+        add_db_argument(sp)
+
+    if sp := add_command("scan-class-methods", "List methods for a specific class"):
+        _ = sp.add_argument("game")
+        _ = sp.add_argument("module")
+        _ = sp.add_argument("class_name", metavar="class")
+        add_no_cache_argument(sp)
+        add_db_argument(sp)
+
+    _ = add_command("list-games", "List all available games")
+
+    if sp := add_command("export-graph", "Export the resolved class graph of a game"):
+        _ = sp.add_argument("game")
+        _ = sp.add_argument(
+            "--module", default="", help="Only export this module (default: all)"
+        )
+        add_graph_format_argument(sp)
+        _ = sp.add_argument(
+            "--output",
+            default="",
+            metavar="PATH",
+            help="File to write the graph to (default: standard output)",
+        )
 
-    _ = sub.add_parser(
-        "list-games", parents=[lexer_parent], help="List all available games"
-    )
+    if sp := add_command("watch", "Print the modules of a game again as its dumps change"):
+        _ = sp.add_argument("game")
+        _ = sp.add_argument(
+            "--interval",
+            type=float,
+            default=0.25,
+            metavar="SECONDS",
+            help="Time between checks of the dumps (default: 0.25)",
+        )
+
+    if sp := add_command("scan-all", "Write the classes of every game to a file"):
+        add_output_dir_argument(sp, "<game>.h")
+        add_pool_jobs_argument(sp)
+
+    if sp := add_command("export-all", "Export the class graph of every game to a file"):
+        add_graph_format_argument(sp)
+        add_output_dir_argument(sp, "<game>.<format>")
+        add_pool_jobs_argument(sp)
+
+    if sp := add_command(
+        "match-versions", "Map the classes of a game version to those of another"
+    ):
+        _ = sp.add_argument("old")
+        _ = sp.add_argument("new")
+        _ = sp.add_argument(
+            "--threshold",
+            type=float,
+            default=0.5,
+            metavar="SIMILARITY",
+            help="Lowest estimated similarity of a match (default: 0.5)",
+        )
+        add_db_argument(sp)
+
+    if sp := add_command(
+        "report-duplicates", "Report the classes a game repeats across its modules"
+    ):
+        _ = sp.add_argument("game")
 
     return parser
 
 
-@dataclass(frozen=True, slots=True)
-class GetPathArgs:
+class GetPathArgs(NamedTuple):
     pass
 
 
-@dataclass(frozen=True, slots=True)
-class SetPathArgs:
+class SetPathArgs(NamedTuple):
     path: str
 
 
-@dataclass(frozen=True, slots=True)
-class ScanGameArgs:
+class ScanGameArgs(NamedTuple):
     game: str
+    jobs: int
+    db: bool
 
 
-@dataclass(frozen=True, slots=True)
-class ScanModuleArgs:
+class ScanModuleArgs(NamedTuple):
     game: str
     module: str
+    jobs: int
+    db: bool
 
 
-@dataclass(frozen=True, slots=True)
-class ScanClassArgs:
+class ScanClassArgs(NamedTuple):
     game: str
     class_name: str
+    jobs: int
+    no_cache: bool
+    db: bool
 
 
-@dataclass(frozen=True, slots=True)
-class ScanMethodsArgs:
+class ScanMethodsArgs(NamedTuple):
     game: str
     module: str
+    db: bool
 
 
-@dataclass(frozen=True, slots=True)
-class ScanClassMethodsArgs:
+class ScanClassMethodsArgs(NamedTuple):
     game: str
     module: str
     class_name: str
+    no_cache: bool
+    db: bool
 
 
-@dataclass(frozen=True, slots=True)
-class ListGamesArgs:
+class ListGamesArgs(NamedTuple):
     pass
 
 
+class ExportGraphArgs(NamedTuple):
+    game: str
+    module: str
+    graph_format: GraphFormat
+    output: str
+
+
+class WatchArgs(NamedTuple):
+    game: str
+    interval: float
+
+
+class ScanAllArgs(NamedTuple):
+    output: str
+    jobs: int | None
+
+
+class ExportAllArgs(NamedTuple):
+    output: str
+    graph_format: GraphFormat
+    jobs: int | None
+
+
+class MatchVersionsArgs(NamedTuple):
+    old: str
+    new: str
+    threshold: float
+    db: bool
+
+
+class ReportDuplicatesArgs(NamedTuple):
+    game: str
+
+
+class ProfileOptions(NamedTuple):
+    output: str
+    trace_memory: bool
+    top: int
+
+
 type Args = (
     GetPathArgs
     | SetPathArgs
@@ -279,66 +723,195 @@ type Args = (
     | ScanMethodsArgs
     | ScanClassMethodsArgs
     | ListGamesArgs
+    | ExportGraphArgs
+    | WatchArgs
+    | ScanAllArgs
+    | ExportAllArgs
+    | MatchVersionsArgs
+    | ReportDuplicatesArgs
 )
 
 
-def parse_args() -> tuple[Args, LexerBackend]:
-    parser = build_parser()
-    ns = parser.parse_args()
+def parse_profile_options(ns: argparse.Namespace) -> ProfileOptions | None:
+    if not ns.profile and not ns.profile_memory:  # pyright: ignore[reportAny]
+        return None
+    return ProfileOptions(
+        f"{ns.command}.pstats",
+        ns.profile_memory,  # pyright: ignore[reportAny]
+        ns.profile_top,  # pyright: ignore[reportAny]
+    )
+
+
+def parse_args() -> tuple[Args, LexerBackend, ProfileOptions | None]:
+    argv = sys.argv[1:]
+    parser = build_parser(argv)
+    ns = parser.parse_args(argv)
     lexer: LexerBackend = ns.lexer  # pyright: ignore[reportAny]
+    profile_options = parse_profile_options(ns)
 
     match ns.command:  # pyright: ignore[reportAny]
         case "get-path":
-            return GetPathArgs(), lexer
+            return GetPathArgs(), lexer, profile_options
         case "set-path":
-            return SetPathArgs(ns.path), lexer  # pyright: ignore[reportAny]
+            return SetPathArgs(ns.path), lexer, profile_options  # pyright: ignore[reportAny]
         case "scan-game":
-            return ScanGameArgs(ns.game), lexer  # pyright: ignore[reportAny]
+            return ScanGameArgs(ns.game, ns.jobs, ns.db), lexer, profile_options  # pyright: ignore[reportAny]
         case "scan-module":
-            return ScanModuleArgs(ns.game, ns.module), lexer  # pyright: ignore[reportAny]
+            return ScanModuleArgs(ns.game, ns.module, ns.jobs, ns.db), lexer, profile_options  # pyright: ignore[reportAny]
         case "scan-class":
-            return ScanClassArgs(ns.game, ns.class_name), lexer  # pyright: ignore[reportAny]
+            return ScanClassArgs(ns.game, ns.class_name, ns.jobs, ns.no_cache, ns.db), lexer, profile_options  # pyright: ignore[reportAny]
         case "scan-methods":
-            return ScanMethodsArgs(ns.game, ns.module), lexer  # pyright: ignore[reportAny]
+            return ScanMethodsArgs(ns.game, ns.module, ns.db), lexer, profile_options  # pyright: ignore[reportAny]
         case "scan-class-methods":
-            return ScanClassMethodsArgs(ns.game, ns.module, ns.class_name), lexer  # pyright: ignore[reportAny]
+            return (
+                ScanClassMethodsArgs(ns.game, ns.module, ns.class_name, ns.no_cache, ns.db),  # pyright: ignore[reportAny]
+                lexer,
+                profile_options,
+            )
         case "list-games":
-            return ListGamesArgs(), lexer
+            return ListGamesArgs(), lexer, profile_options
+        case "export-graph":
+            return ExportGraphArgs(ns.game, ns.module, ns.format, ns.output), lexer, profile_options  # pyright: ignore[reportAny]
+        case "watch":
+            return WatchArgs(ns.game, ns.interval), lexer, profile_options  # pyright: ignore[reportAny]
+        case "scan-all":
+            return ScanAllArgs(ns.output, ns.jobs), lexer, profile_options  # pyright: ignore[reportAny]
+        case "export-all":
+            return ExportAllArgs(ns.output, ns.format, ns.jobs), lexer, profile_options  # pyright: ignore[reportAny]
+        case "match-versions":
+            return (
+                MatchVersionsArgs(ns.old, ns.new, ns.threshold, ns.db),  # pyright: ignore[reportAny]
+                lexer,
+                profile_options,
+            )
+        case "report-duplicates":
+            return ReportDuplicatesArgs(ns.game), lexer, profile_options  # pyright: ignore[reportAny]
         case _:  # pyright: ignore[reportAny]
             raise SystemExit(f"Unknown command: {ns.command}")  # pyright: ignore[reportAny]
 
 
 def main():
-    args, lexer_backend = parse_args()
+    args, lexer_backend, profile_options = parse_args()
     config = create_config_parser()
 
+    if profile_options is None:
+        run_command(config, args, lexer_backend)
+        return
+
+    from ipcg.profiler import profile
+
+    with profile(
+        profile_options.output,
+        trace_memory=profile_options.trace_memory,
+        top=profile_options.top,
+    ):
+        run_command(config, args, lexer_backend)
+
+
+def run_command(config: ConfigParser, args: Args, lexer_backend: LexerBackend) -> None:
     match args:
         case GetPathArgs():
             print(get_config_path(config))
         case SetPathArgs(path):
             set_config_path(config, path)
             save_config(config)
-        case ScanGameArgs(game):
-            scan_game_classes(config, game=game, lexer_backend=lexer_backend)
-        case ScanModuleArgs(game, module):
-            scan_game_classes(
-                config, game=game, module=module, lexer_backend=lexer_backend
-            )
-        case ScanClassArgs(game, class_name):
+        case ScanGameArgs(game, jobs, db):
+            scan_game_classes(config, game=game, jobs=jobs, lexer_backend=lexer_backend, db=db)
+        case ScanModuleArgs(game, module, jobs, db):
             scan_game_classes(
-                config, game=game, identifier=class_name, lexer_backend=lexer_backend
+                config,
+                game=game,
+                module=module,
+                jobs=jobs,
+                lexer_backend=lexer_backend,
+                db=db,
             )
-        case ScanMethodsArgs(game, module):
+        case ScanClassArgs(game, class_name, jobs, no_cache, db):
+
+            def scan_class() -> None:
+                scan_game_classes(
+                    config,
+                    game=game,
+                    identifier=class_name,
+                    jobs=jobs,
+                    lexer_backend=lexer_backend,
+                    db=db,
+                )
+
+            if no_cache:
+                scan_class()
+            else:
+                run_cached_query(
+                    config,
+                    scan_class,
+                    command="scan-class",
+                    game=game,
+                    identifier=class_name,
+                    lexer_backend=lexer_backend,
+                )
+        case ScanMethodsArgs(game, module, db):
             scan_game_methods(
-                config, game=game, module=module, lexer_backend=lexer_backend
+                config, game=game, module=module, lexer_backend=lexer_backend, db=db
             )
-        case ScanClassMethodsArgs(game, module, class_name):
-            scan_game_methods(
+        case ScanClassMethodsArgs(game, module, class_name, no_cache, db):
+
+            def scan_class_methods() -> None:
+                scan_game_methods(
+                    config,
+                    game=game,
+                    module=module,
+                    identifier=class_name,
+                    lexer_backend=lexer_backend,
+                    db=db,
+                )
+
+            if no_cache:
+                scan_class_methods()
+            else:
+                run_cached_query(
+                    config,
+                    scan_class_methods,
+                    command="scan-class-methods",
+                    game=game,
+                    module=module,
+                    identifier=class_name,
+                    lexer_backend=lexer_backend,
+                )
+        case ListGamesArgs():
+            list_games(config)
+        case ExportGraphArgs(game, module, graph_format, output):
+            export_game_graph(
                 config,
                 game=game,
                 module=module,
-                identifier=class_name,
+                graph_format=graph_format,
+                output=output,
                 lexer_backend=lexer_backend,
             )
-        case ListGamesArgs():
-            list_games(config)
+        case WatchArgs(game, interval):
+            watch_game(
+                config, game=game, interval=interval, lexer_backend=lexer_backend
+            )
+        case ScanAllArgs(output, jobs):
+            scan_all_games(
+                config, output_dir=output, jobs=jobs, lexer_backend=lexer_backend
+            )
+        case ExportAllArgs(output, graph_format, jobs):
+            export_all_games(
+                config,
+                output_dir=output,
+                graph_format=graph_format,
+                jobs=jobs,
+                lexer_backend=lexer_backend,
+            )
+        case MatchVersionsArgs(old, new, threshold, db):
+            match_game_versions(
+                config,
+                old=old,
+                new=new,
+                threshold=threshold,
+                lexer_backend=lexer_backend,
+                db=db,
+            )
+        case ReportDuplicatesArgs(game):
+            report_game_duplicates(config, game=game, lexer_backend=lexer_backend)
@@ -0,0 +1,27 @@
+import os
+import shutil
+from pathlib import Path
+
+from ipcg.api import load_game
+
+FIXTURE = Path(__file__).parent / "fixtures" / "diamond"
+
+
+def test_module_changed_in_place_is_read_again(tmp_path: Path) -> None:
+    game = tmp_path / "game"
+    _ = shutil.copytree(FIXTURE, game)
+    names = [view.name for view in load_game(game, module="lib.dll").iter_classes()]
+    assert "LibEntity" in names
+
+    # the block of lib.dll moves, but the dump keeps its size and
+    # modification time, so only the digest of the block tells the change
+    inheritance = game / "inheritance.txt"
+    stat = inheritance.stat()
+    text = inheritance.read_text()
+    text = text.replace("BrokenAttachment", "BrokenAttachmen").replace("LibEntity", "LibEntityy")
+    _ = inheritance.write_text(text)
+    os.utime(inheritance, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert inheritance.stat().st_size == stat.st_size
+
+    names = [view.name for view in load_game(game, module="lib.dll").iter_classes()]
+    assert "LibEntityy" in names
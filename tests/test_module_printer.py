@@ -0,0 +1,29 @@
+import multiprocessing
+from pathlib import Path
+
+import pytest
+
+from ipcg.api import load_game
+from ipcg.module_printer import Printer
+
+# two modules of the same classes, with bases reached along several paths, and
+# a faulty class, whose base has a vtable too short for the base it derives from
+FIXTURE = Path(__file__).parent / "fixtures" / "diamond"
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_print_matches_expected_output(jobs: int, capsys: pytest.CaptureFixture[str]) -> None:
+    Printer(jobs=jobs).print(load_game(FIXTURE))
+
+    expected = (FIXTURE / "module_printer.txt").read_text()
+    assert capsys.readouterr().out == expected
+
+
+def test_print_without_fork_matches_expected_output(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr(multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+    Printer(jobs=2).print(load_game(FIXTURE))
+
+    expected = (FIXTURE / "module_printer.txt").read_text()
+    assert capsys.readouterr().out == expected
@@ -0,0 +1,50 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+MAIN = Path(__file__).parent.parent / "main.py"
+
+# import time of the light commands, interpreter startup included
+BUDGET_MS = 50
+HEAVY_MODULES = ("ipcg.parser", "ipcg.class_resolver", "pygments", "asyncio")
+
+
+def get_imports(command: str, cwd: Path) -> list[tuple[str, bool, int]]:
+    """
+    Run `command` under `-X importtime` and return the modules it imported,
+    whether they were imported at the top level, and their cumulative import
+    time in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(MAIN), command],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports: list[tuple[str, bool, int]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.endswith("imported package"):
+            continue
+        _, cumulative, name = line.split("|")
+        # nested imports are indented by two more spaces per level
+        imports.append((name.strip(), not name.startswith("  "), int(cumulative)))
+    return imports
+
+
+@pytest.mark.parametrize("command", ["get-path", "list-games"])
+def test_light_commands_skip_heavy_imports(command: str, tmp_path: Path) -> None:
+    _ = (tmp_path / "config.cfg").write_text(f"[Paths]\nclass_dumper_dir={tmp_path}\n")
+    imports = get_imports(command, tmp_path)
+
+    heavy = [
+        name
+        for name, _, _ in imports
+        if any(name == module or name.startswith(f"{module}.") for module in HEAVY_MODULES)
+    ]
+    assert heavy == []
+
+    total = sum(cumulative for _, is_top_level, cumulative in imports if is_top_level)
+    assert total / 1000 < BUDGET_MS